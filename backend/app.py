@@ -1,19 +1,38 @@
-from fastapi import FastAPI, HTTPException, Request, Depends
+import time
+
+# Cold-start clock: from the first import until every required component is up
+IMPORT_STARTED = time.monotonic()
+
+from fastapi import FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 import redis
 import json
-from typing import Optional
+import asyncio
+from typing import Awaitable, Optional, List, Dict
 import sqlite3
 import hashlib
-from recommender import LightweightRecommender
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOAuth
+from recommender import LightweightRecommender, parse_rerank_weights, resolve_model_dir
+from catalog_delta import DeltaLog, delta_log_path
+from model_registry import ModelRegistry
+from spotipy.oauth2 import SpotifyOAuth
+from spotify_client import AsyncSpotifyClient, failure_reason
+from feature_store import AudioFeatureStore, TrackLookupStore, normalize_query
+from singleflight import SingleFlight
+from response_cache import ResponseCache
+from taste_profile import PROFILE_TIME_RANGES, build_profile, diversify, profile_average, update_profile
+import database
+import metrics
+from metrics import time_stage
+from readiness import Readiness
 import os
+import sys
 from dotenv import load_dotenv
 import logging
 import secrets
+import fcntl
 import base64
 import requests
 from urllib.parse import urlencode
@@ -71,96 +90,354 @@ def get_current_token():
         logger.error(f"Error getting token: {str(e)}")
         return None
 
-def get_user_spotify_client(token: str = Depends(get_current_token)):
-    """Get an authenticated Spotify client"""
+def get_user_token(token: str = Depends(get_current_token)):
+    """Require an authenticated user token"""
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return spotipy.Spotify(auth=token)
+    return token
 
-def get_db():
-    """Get SQLite database connection"""
-    try:
-        conn = sqlite3.connect('songs.db')
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e:
-        logger.error(f"Database connection failed: {e}")
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-# Initialize Spotify client with client credentials (for non-user endpoints)
-try:
-    spotify = spotipy.Spotify(
-        client_credentials_manager=SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET
-        )
-    )
-    # Test the connection
-    spotify.search(q="test", limit=1)
-    logger.info("Spotify client initialized successfully")
-except Exception as e:
-    logger.error(f"Spotify client initialization failed: {str(e)}")
-    raise
+# Pooled SQLite connections shared by all request handlers
+DB_PATH = os.getenv("SONGS_DB_PATH", "songs.db")
+db_pool = database.ConnectionPool(
+    DB_PATH,
+    size=int(os.getenv("DB_POOL_SIZE", 8)),
+    mmap_size=int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+)
 
-# Initialize Redis
-try:
-    redis_host = os.getenv("REDIS_HOST", "redis")
-    redis_port = int(os.getenv("REDIS_PORT", 6379))
-    redis_client = redis.Redis(
-        host=redis_host,
-        port=redis_port,
-        db=0,
-        decode_responses=True
-    )
-    redis_client.ping()
-    logger.info(f"Redis connection successful at {redis_host}:{redis_port}")
-except redis.ConnectionError as e:
-    logger.error(f"Redis connection failed: {str(e)}")
-    redis_client = None
+# Acquiring a connection blocks while the pool is empty, so connections are only taken
+# off the event loop and never held across an await
+def fetch_song_rows(song_ids: List[int]) -> list:
+    """Song rows for the given ids, in order; call through run_in_threadpool"""
+    with db_pool.connection() as conn:
+        return database.fetch_songs(conn, song_ids)
+
+def find_catalog_song(recommender: LightweightRecommender, song_name: str, artist_name: Optional[str]) -> Optional[tuple]:
+    """(catalog id, song row) of a song the pinned model covers, or None; call through run_in_threadpool"""
+    with db_pool.connection() as conn:
+        song_id = database.find_song(conn, song_name, artist_name)
+        # The songs table can briefly be ahead of the pinned model while a new version loads
+        rows = database.fetch_songs(conn, [song_id]) if song_id is not None and song_id < recommender.n_songs else []
+    return (song_id, dict(rows[0])) if rows else None
+
+# Async Spotify client with client credentials (for non-user endpoints);
+# user-token calls go through the same connection pool. Every call has a deadline,
+# and a circuit breaker makes calls fail fast while Spotify is down or rate limiting us
+spotify = AsyncSpotifyClient(
+    client_id=SPOTIFY_CLIENT_ID,
+    client_secret=SPOTIFY_CLIENT_SECRET,
+    max_connections=int(os.getenv("SPOTIFY_MAX_CONNECTIONS", 20)),
+    max_concurrency=int(os.getenv("SPOTIFY_MAX_CONCURRENCY", 10)),
+    deadline=float(os.getenv("SPOTIFY_DEADLINE", 5.0)),
+    search_deadline=float(os.getenv("SPOTIFY_SEARCH_DEADLINE", 3.0)),
+    hedge_after=float(os.getenv("SPOTIFY_HEDGE_AFTER", 0.5)),
+    failure_threshold=int(os.getenv("SPOTIFY_BREAKER_THRESHOLD", 5)),
+    reset_timeout=float(os.getenv("SPOTIFY_BREAKER_RESET", 30.0))
+)
+
+# Persistent track ID -> audio features cache
+SPOTIFY_AUDIO_FEATURES_BATCH = 100
+feature_store = AudioFeatureStore(db_pool, ttl=float(os.getenv("AUDIO_FEATURES_TTL", 90 * 24 * 3600)))
+
+# Persistent (song, artist) -> track cache, so repeated queries skip the Spotify search;
+# misses are remembered for a shorter time
+track_store = TrackLookupStore(
+    db_pool,
+    ttl=float(os.getenv("TRACK_LOOKUP_TTL", 7 * 24 * 3600)),
+    negative_ttl=float(os.getenv("TRACK_LOOKUP_NEGATIVE_TTL", 3600))
+)
+
+# Concurrent identical lookups and recommendations share one computation
+track_flight = SingleFlight("track_lookup")
+recommend_flight = SingleFlight("recommend")
+
+# Redis client; it connects on first use, and startup checks it in the background
+redis_host = os.getenv("REDIS_HOST", "redis")
+redis_port = int(os.getenv("REDIS_PORT", 6379))
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 1.0))
+redis_client = redis.Redis(
+    host=redis_host,
+    port=redis_port,
+    db=0,
+    socket_connect_timeout=REDIS_TIMEOUT,
+    socket_timeout=REDIS_TIMEOUT
+)
+
+# Serialized /recommend responses: in-process LRU first, then Redis
+recommendation_cache = ResponseCache(
+    'recommendations',
+    redis_client,
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600))
+)
+
+# Per-user taste profiles: rebuilt from all top-track ranges when old, otherwise
+# topped up from recent top tracks every PROFILE_REFRESH_AFTER seconds
+PROFILE_REFRESH_AFTER = float(os.getenv("PROFILE_REFRESH_AFTER", 6 * 3600))
+PROFILE_REBUILD_AFTER = float(os.getenv("PROFILE_REBUILD_AFTER", 7 * 24 * 3600))
+profile_cache = ResponseCache('profiles', redis_client, max_bytes=8 * 1024 * 1024, ttl=30 * 24 * 3600)
+# Spotify access tokens expire after an hour, so a token's user id is kept that long
+USER_ID_TTL = 3600
+
+# Per-user Spotify passthrough responses (/me, /top-tracks), keyed by token
+ME_CACHE_TTL = float(os.getenv("ME_CACHE_TTL", 600))
+TOP_TRACKS_CACHE_TTL = float(os.getenv("TOP_TRACKS_CACHE_TTL", 3600))
+user_cache = ResponseCache('user_responses', redis_client, max_bytes=8 * 1024 * 1024, ttl=ME_CACHE_TTL)
 
 # Initialize recommender
+MODELS_ROOT = os.getenv("MODELS_ROOT", "models")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Songs added while serving are buffered per model and folded into a new version past this size
+DELTA_COMPACT_THRESHOLD = int(os.getenv("DELTA_COMPACT_THRESHOLD", 5000))
+MAX_ADDED_SONGS = 1000
+
+def delta_log_for(recommender: LightweightRecommender) -> DeltaLog:
+    """The shared log of songs added to this model's lineage"""
+    return DeltaLog(delta_log_path(MODELS_ROOT, recommender.lineage))
+
+def catch_up_delta(recommender: LightweightRecommender):
+    """Apply songs appended to the delta log, by any worker, since this recommender last read it"""
+    songs, offset = delta_log_for(recommender).read(recommender.delta_log_offset)
+    try:
+        recommender.add_songs(songs)
+    except ValueError as e:
+        logger.error(f"Delta log does not continue model {recommender.model_version}: {str(e)}")
+    recommender.delta_log_offset = offset
+
+# Rerank weights as "scorer=weight,..." (similarity, temporal, popularity); unset scorers keep their defaults
+RERANK_WEIGHTS = parse_rerank_weights(os.getenv("RERANK_WEIGHTS", ""))
+RECOMMEND_CANDIDATE_MULTIPLIER = int(os.getenv("RECOMMEND_CANDIDATE_MULTIPLIER", 5))
+
+def load_recommender(model_dir: str) -> LightweightRecommender:
+    """Load a recommender from a model directory"""
+    recommender = LightweightRecommender(engine=os.getenv("RECOMMENDER_ENGINE", "annoy"))
+    recommender.load_model(model_dir)
+    recommender.set_rerank_weights(RERANK_WEIGHTS)
+    recommender.candidate_multiplier = RECOMMEND_CANDIDATE_MULTIPLIER
+    recommender.candidate_observer = metrics.observe_candidates
+    catch_up_delta(recommender)
+    return recommender
+
+# Startup state reported by /ready. Only the model and the SQLite catalog gate traffic;
+# Redis and Spotify are checked in the background and the service degrades without them
+readiness = Readiness(IMPORT_STARTED, budget=float(os.getenv("COLD_START_BUDGET", 10.0)))
+for component in ('import', 'model', 'databases', 'catalog'):
+    readiness.register(component)
+readiness.register('redis', required=False)
+readiness.register('spotify', required=False)
+
+# The model is memory-mapped, so loading it at import is cheap and lets preloaded
+# workers share its pages; if it fails, startup keeps retrying instead of exiting
+model_registry = ModelRegistry()
+model_reload_lock = asyncio.Lock()
+model_load_started = time.monotonic()
 try:
-    recommender = LightweightRecommender()
-    recommender.load_model('models')
+    model_registry.swap(load_recommender(resolve_model_dir(MODELS_ROOT)))
+    readiness.record('model', time.monotonic() - model_load_started, detail=model_registry.current.model_version)
     logger.info("Recommender model loaded successfully")
 except Exception as e:
+    readiness.record('model', time.monotonic() - model_load_started, error=e)
     logger.error(f"Failed to load recommender model: {str(e)}")
-    raise
+
+def get_recommender():
+    """Pin the serving recommender for the duration of a request"""
+    with model_registry.acquire() as recommender:
+        yield recommender
+
+def sync_catalog(recommender: LightweightRecommender):
+    """Reload the songs table unless it already holds this model version's catalog"""
+    # With several workers only one loads the catalog; the others wait and then find it current
+    with open(f"{DB_PATH}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # Bulk loading uses its own connection, independent of the pool
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            database.init_schema(conn)
+            if database.catalog_is_current(conn, recommender.model_version):
+                logger.info(f"Song catalog matches model version {recommender.model_version}, skipping load")
+            elif database.catalog_covers(conn, recommender.lineage, len(recommender.years)):
+                # A compaction of the loaded lineage: every song it indexes is already in the table
+                logger.info(f"Song catalog already covers model version {recommender.model_version}, skipping load")
+                database.set_catalog_version(conn, recommender.model_version, recommender.lineage)
+                conn.commit()
+            else:
+                database.bulk_load_songs(
+                    conn, recommender.iter_catalog(), recommender.model_version, recommender.lineage
+                )
+            # Songs added after the model was built are not in its catalog; a bulk load drops them
+            catch_up_delta(recommender)
+            if recommender.delta_songs:
+                database.insert_songs(conn, recommender.delta_songs)
+        finally:
+            conn.close()
+
+async def swap_model(model_dir: str):
+    """Load a model directory off the event loop and make it the serving model; returns the new recommender and previous version"""
+    # Loading and catalog sync run off the event loop; requests keep using the old model
+    new_recommender = await run_in_threadpool(load_recommender, model_dir)
+    await run_in_threadpool(sync_catalog, new_recommender)
+    previous_version = model_registry.swap(new_recommender)
+    # Songs added to the old model while the new one was loading
+    await run_in_threadpool(catch_up_delta, new_recommender)
+    return new_recommender, previous_version
+
+# Each worker process serves its own registry, so with several workers a new version is
+# rolled out by publishing models/CURRENT and letting every worker pick it up
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 0))
+
+async def watch_published_model():
+    """Swap in the model named by models/CURRENT whenever it changes, and apply songs other workers added"""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            model_dir = resolve_model_dir(MODELS_ROOT)
+            if model_dir != model_registry.current.model_dir and not model_reload_lock.locked():
+                async with model_reload_lock:
+                    logger.info(f"Published model changed, loading {model_dir}")
+                    await swap_model(model_dir)
+            await run_in_threadpool(catch_up_delta, model_registry.current)
+        except Exception as e:
+            logger.error(f"Failed to load published model: {str(e)}", exc_info=True)
+
+compaction_lock = asyncio.Lock()
+
+# Compaction rebuilds every index, so it runs as a separate low-priority process and never in
+# the serving threadpool; it can also run offline (e.g. from cron) against the same MODELS_ROOT
+COMPACTION_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compaction.py")
+
+async def compact_catalog(min_delta: int = 1) -> Optional[str]:
+    """Run the compaction job and swap in the version it publishes; returns the new version"""
+    async with compaction_lock:
+        # The job takes a lock shared by all workers; the others pick its result up through CURRENT
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, COMPACTION_SCRIPT,
+            '--models-root', MODELS_ROOT,
+            '--min-delta', str(min_delta),
+            '--engine', os.getenv("RECOMMENDER_ENGINE", "annoy"),
+            '--rerank-weights', ','.join(f"{name}={weight}" for name, weight in RERANK_WEIGHTS.items()),
+            '--candidate-multiplier', str(RECOMMEND_CANDIDATE_MULTIPLIER),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"Compaction job exited with status {process.returncode}: {stderr.decode()[-1000:].strip()}")
+        version = json.loads(stdout.decode().strip().splitlines()[-1])['model_version']
+        if version is None:
+            return None
+        async with model_reload_lock:
+            await swap_model(resolve_model_dir(MODELS_ROOT, version))
+        logger.info(f"Compacted the catalog into model version {version}")
+        return version
+
+async def compact_in_background():
+    """Run a threshold-triggered compaction, logging failures"""
+    try:
+        await compact_catalog(DELTA_COMPACT_THRESHOLD)
+    except Exception as e:
+        logger.error(f"Catalog compaction failed: {str(e)}", exc_info=True)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe per-endpoint latency, labelled by route template to keep cardinality bounded"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        endpoint = route.path if route is not None else 'unmatched'
+        metrics.REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(time.perf_counter() - start)
 
 class RecommendRequest(BaseModel):
     song_name: str
     artist_name: Optional[str] = None
     limit: Optional[int] = 10
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and load song data on startup"""
+class BatchSeed(BaseModel):
+    song_name: Optional[str] = None
+    artist_name: Optional[str] = None
+    features: Optional[Dict[str, float]] = None
+    year: Optional[int] = None
+
+class BatchRecommendRequest(BaseModel):
+    seeds: List[BatchSeed]
+    # Each seed's candidate pool scales with limit, so it is capped like /search
+    limit: int = Field(10, ge=1, le=50)
+
+MAX_BATCH_SEEDS = 500
+
+# Local search orders; popularity order is paged with keyset cursors
+SEARCH_SORTS = ('relevance', 'popularity')
+# Streamed /search formats and their media types
+SEARCH_STREAM_TYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def require_ready():
+    """Reject requests with a 503 until the model and catalog are up"""
+    if not readiness.ready:
+        raise HTTPException(status_code=503, detail="Service is starting", headers={"Retry-After": "1"})
+
+async def load_serving_model() -> str:
+    """Load the published model if the import-time load failed"""
+    model_registry.swap(await run_in_threadpool(load_recommender, resolve_model_dir(MODELS_ROOT)))
+    return model_registry.current.model_version
+
+def init_databases():
+    feature_store.init_schema()
+    track_store.init_schema()
+
+def connect_redis() -> str:
+    """Check Redis; without it the response caches stay in-process only"""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS songs (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                artists TEXT,
-                year INTEGER,
-                popularity REAL
-            )
-        ''')
-        cur.execute('SELECT COUNT(*) FROM songs')
-        if cur.fetchone()[0] == 0:
-            song_data = recommender.song_data
-            for idx, row in song_data.iterrows():
-                cur.execute(
-                    'INSERT INTO songs (id, name, artists, year, popularity) VALUES (?, ?, ?, ?, ?)',
-                    (idx, row['name'], str(row['artists']), row['year'], row['popularity'])
-                )
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {str(e)}")
+        redis_client.ping()
+    except redis.RedisError:
+        for cache in (recommendation_cache, profile_cache, user_cache):
+            cache.redis = None
         raise
+    return f"{redis_host}:{redis_port}"
+
+async def start_serving():
+    """Bring up the components that gate traffic: cache tables, then the model and its catalog"""
+    await readiness.run('databases', lambda: run_in_threadpool(init_databases))
+    if model_registry.current is None:
+        await readiness.run('model', load_serving_model)
+    await readiness.run('catalog', lambda: run_in_threadpool(sync_catalog, model_registry.current))
+    if MODEL_WATCH_INTERVAL > 0:
+        asyncio.create_task(watch_published_model())
+
+async def bootstrap():
+    """Bring every component up concurrently; slow or failing network dependencies do not hold up serving"""
+    await asyncio.gather(
+        start_serving(),
+        readiness.run('redis', lambda: run_in_threadpool(connect_redis)),
+        readiness.run('spotify', spotify.warm_up)
+    )
+
+@app.on_event("startup")
+async def startup_event():
+    """Start bringing components up in the background so the server accepts connections at once"""
+    app.state.bootstrap = asyncio.create_task(bootstrap())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled Spotify and database connections"""
+    app.state.bootstrap.cancel()
+    await spotify.aclose()
+    db_pool.close_all()
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is up and its event loop is responsive"""
+    return {"status": "ok"}
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness: the startup state of each component; 503 until the model and catalog are up"""
+    report = readiness.report()
+    report['spotify_circuit'] = spotify.breaker.state
+    return JSONResponse(report, status_code=200 if report['ready'] else 503)
 
 @app.get("/login")
 async def login():
@@ -180,61 +457,138 @@ async def callback(code: str = None, state: str = None):
     if not code:
         raise HTTPException(status_code=400, detail="No authorization code received")
     try:
-        token_info = oauth2_scheme.get_access_token(code)
+        token_info = await run_in_threadpool(oauth2_scheme.get_access_token, code)
         logger.info("Successfully obtained access token")
         return JSONResponse(content=token_info)
     except Exception as e:
         logger.error(f"Failed to get token: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to complete authentication: {str(e)}")
 
+async def cached_user_response(request: Request, cache_key: str, ttl: float, fetch) -> Response:
+    """Serve a per-user JSON response from the cache, answering 304 when the client's ETag still matches"""
+    body = user_cache.get(cache_key)
+    if body is None:
+        body = json.dumps(await fetch(), separators=(',', ':')).encode()
+        user_cache.set(cache_key, body, ttl)
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    # Private and revalidated on every use: the browser keeps the body, we answer with 304s
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def user_cache_key(token: str, *parts) -> str:
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    return '_'.join(['user', token_key, *map(str, parts)])
+
 @app.get("/me", description="Get current user info")
-async def get_me(spotify_client: spotipy.Spotify = Depends(get_user_spotify_client)):
+async def get_me(request: Request, token: str = Depends(get_user_token)):
     """Get current user profile"""
     try:
-        me = spotify_client.me()
-        return me
+        return await cached_user_response(request, user_cache_key(token, 'me'), ME_CACHE_TTL, lambda: spotify.me(token))
     except Exception as e:
         logger.error(f"Failed to get user profile: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get user profile: {str(e)}")
 
 @app.get("/top-tracks", description="Get user's top tracks")
 async def get_top_tracks(
+    request: Request,
     time_range: str = "medium_term",
     limit: int = 20,
-    spotify_client: spotipy.Spotify = Depends(get_user_spotify_client)
+    token: str = Depends(get_user_token)
 ):
     """Get user's top tracks"""
     try:
-        top_tracks = spotify_client.current_user_top_tracks(limit=limit, time_range=time_range)
-        return top_tracks
+        return await cached_user_response(
+            request,
+            user_cache_key(token, 'top', time_range, limit),
+            TOP_TRACKS_CACHE_TTL,
+            lambda: spotify.current_user_top_tracks(token, limit=limit, time_range=time_range)
+        )
     except Exception as e:
         logger.error(f"Failed to get top tracks: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get top tracks: {str(e)}")
 
-def extract_spotify_features(track_id: str) -> dict:
+async def resolve_track(song_name: str, artist_name: Optional[str] = None) -> Optional[dict]:
+    """Resolve a song/artist query to a compact track dict, or None if Spotify has no match"""
+    query_key = normalize_query(song_name, artist_name)
+    found, track = await run_in_threadpool(track_store.get, query_key)
+    if found:
+        metrics.CACHE_LOOKUPS.labels('track_lookup', 'hit' if track else 'negative_hit').inc()
+        return track
+    metrics.CACHE_LOOKUPS.labels('track_lookup', 'miss').inc()
+    return await track_flight.do(query_key, lambda: search_track(query_key, song_name, artist_name))
+
+async def search_track(query_key: str, song_name: str, artist_name: Optional[str]) -> Optional[dict]:
+    """Search Spotify for the best match and cache the outcome; errors are not cached"""
+    query = f"track:{song_name}"
+    if artist_name:
+        query += f" artist:{artist_name}"
+    logger.debug(f"Searching Spotify with query: {query}")
+    # Hedged: a slow search gets a backup request instead of holding up the recommendation
+    results = await spotify.search(q=query, limit=1, type='track', hedged=True)
+    if not results['tracks']['items']:
+        logger.warning(f"No tracks found for query: {query}")
+        await run_in_threadpool(track_store.put, query_key, None)
+        return None
+    item = results['tracks']['items'][0]
+    track = {
+        'id': item['id'],
+        'name': item['name'],
+        'artists': [artist['name'] for artist in item['artists']],
+        'year': int(item['album']['release_date'][:4]),
+        'preview_url': item['preview_url'],
+        'external_url': item['external_urls']['spotify']
+    }
+    await run_in_threadpool(track_store.put, query_key, track)
+    return track
+
+async def extract_spotify_features(track_id: str) -> dict:
     """Extract audio features from a Spotify track with improved error handling"""
-    try:
-        logger.debug(f"Requesting audio features for track ID: {track_id}")
-        # Pass track_id as a list since the API expects an array of IDs
-        features = spotify.audio_features([track_id])
-        
-        if not features or not features[0]:
-            logger.error(f"No audio features returned for {track_id}")
-            return get_fallback_features()
-        
-        # Get first element since we only requested one track
-        feature_data = features[0]
-        logger.debug(f"Successfully retrieved features: {feature_data}")
-        
-        return {
-            'acousticness': feature_data['acousticness'],
-            'liveness': feature_data['liveness'],
-            'valence': feature_data['valence'],
-            'tempo': feature_data['tempo']
-        }
-    except Exception as e:
-        logger.error(f"Failed to extract Spotify features: {str(e)}")
-        return get_fallback_features()
+    features = await extract_spotify_features_many([track_id])
+    return features[track_id]
+
+async def extract_spotify_features_many(track_ids: List[str], fallback: bool = True) -> Dict[str, dict]:
+    """Extract audio features for many tracks, serving hits from the store and batching the misses.
+
+    Tracks whose features cannot be fetched get fallback features, or are left out when fallback is False.
+    """
+    track_ids = list(dict.fromkeys(track_ids))
+    features_by_id = await run_in_threadpool(feature_store.get_many, track_ids)
+    misses = [track_id for track_id in track_ids if track_id not in features_by_id]
+    metrics.CACHE_LOOKUPS.labels('audio_features', 'hit').inc(len(features_by_id))
+    metrics.CACHE_LOOKUPS.labels('audio_features', 'miss').inc(len(misses))
+    logger.debug(f"Audio features: {len(features_by_id)} cached, {len(misses)} to fetch")
+    
+    fetched = {}
+    for start in range(0, len(misses), SPOTIFY_AUDIO_FEATURES_BATCH):
+        chunk = misses[start:start + SPOTIFY_AUDIO_FEATURES_BATCH]
+        try:
+            for track_id, feature_data in zip(chunk, await spotify.audio_features(chunk)):
+                if not feature_data:
+                    logger.error(f"No audio features returned for {track_id}")
+                    metrics.FALLBACKS.labels('audio_features_missing').inc()
+                    continue
+                fetched[track_id] = {
+                    'acousticness': feature_data['acousticness'],
+                    'liveness': feature_data['liveness'],
+                    'valence': feature_data['valence'],
+                    'tempo': feature_data['tempo']
+                }
+        except Exception as e:
+            logger.error(f"Failed to extract Spotify features: {str(e)}")
+            metrics.FALLBACKS.labels(f"audio_features_{failure_reason(e)}").inc(len(chunk))
+    
+    # Audio features never change for a track ID, so only real results are persisted
+    await run_in_threadpool(feature_store.put_many, fetched)
+    features_by_id.update(fetched)
+    
+    if fallback:
+        for track_id in track_ids:
+            if track_id not in features_by_id:
+                features_by_id[track_id] = get_fallback_features()
+    return features_by_id
 
 def get_fallback_features() -> dict:
     """Get fallback features when Spotify API fails"""
@@ -246,14 +600,9 @@ def get_fallback_features() -> dict:
         'tempo': 120.0
     }
 
-@app.get("/search")
-async def search(query: str, limit: int = 50):
-    """Search for songs in Spotify and local database"""
-    if limit > 50:
-        limit = 50
-    spotify_results = spotify.search(q=query, limit=limit, type='track')
-    tracks = spotify_results['tracks']['items']
-    spotify_songs = [{
+def spotify_song(track: dict) -> dict:
+    """A Spotify search result in the shape of a local song row"""
+    return {
         'id': track['id'],
         'name': track['name'],
         'artists': [artist['name'] for artist in track['artists']],
@@ -262,145 +611,412 @@ async def search(query: str, limit: int = 50):
         'preview_url': track['preview_url'],
         'external_url': track['external_urls']['spotify'],
         'source': 'spotify'
-    } for track in tracks]
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute('''
-        SELECT * FROM songs 
-        WHERE name LIKE ? OR artists LIKE ?
-        ORDER BY popularity DESC
-        LIMIT ?
-    ''', (f'%{query}%', f'%{query}%', limit))
-    local_results = [{**dict(row), 'source': 'local'} for row in cur.fetchall()]
-    conn.close()
-    all_results = spotify_songs + local_results
-    return {"results": all_results}
-
-@app.post("/recommend")
+    }
+
+async def search_spotify_songs(query: str, limit: int) -> List[dict]:
+    """Spotify search results; empty when Spotify fails, so search degrades to local results"""
+    try:
+        with time_stage('/search', 'spotify_search'):
+            spotify_results = await spotify.search(q=query, limit=limit, type='track')
+        tracks = spotify_results['tracks']['items']
+    except Exception as e:
+        logger.error(f"Spotify search failed, returning local results only: {str(e)}")
+        metrics.FALLBACKS.labels(f"search_spotify_{failure_reason(e)}").inc()
+        return []
+    return [spotify_song(track) for track in tracks]
+
+def search_local_songs(query: str, limit: int, sort: str, after: Optional[tuple]) -> dict:
+    """Local search results; popularity order also returns the cursor of the next page (None after the last)"""
+    with time_stage('/search', 'db_search'), db_pool.connection() as conn:
+        if sort == 'popularity':
+            rows = database.search_songs_page(conn, query, limit, after)
+        else:
+            rows = database.search_songs(conn, query, limit)
+    next_cursor = database.encode_search_cursor(rows[-1]) if sort == 'popularity' and len(rows) == limit else None
+    return {'results': [{**dict(row), 'source': 'local'} for row in rows], 'next_cursor': next_cursor}
+
+def search_event(source: str, payload: dict, stream: str) -> str:
+    """One streamed search event: an NDJSON line or a server-sent event"""
+    data = json.dumps({'source': source, **payload}, separators=(',', ':'))
+    if stream == 'sse':
+        return f"event: {source}\ndata: {data}\n\n"
+    return data + '\n'
+
+async def stream_search(sources: Dict[str, Awaitable], stream: str):
+    """Send each source's results as soon as its search completes"""
+    pending = {asyncio.ensure_future(future): source for source, future in sources.items()}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                source = pending.pop(task)
+                try:
+                    payload = task.result()
+                except Exception as e:
+                    logger.error(f"Streamed {source} search failed: {str(e)}")
+                    payload = {'error': "Search failed"}
+                else:
+                    payload = payload if isinstance(payload, dict) else {'results': payload}
+                yield search_event(source, payload, stream)
+        # EventSource reconnects when a stream ends, so tell SSE clients the search is complete
+        if stream == 'sse':
+            yield search_event('done', {}, stream)
+    finally:
+        # The client went away: stop searches it will never receive
+        for task in pending:
+            task.cancel()
+
+@app.get("/search", dependencies=[Depends(require_ready)])
+async def search(query: str, limit: int = 50, sort: str = 'relevance', cursor: Optional[str] = None,
+                 stream: Optional[str] = None):
+    """Search for songs in Spotify and local database, concurrently.
+
+    sort=popularity (implied by a cursor) pages local results with keyset cursors;
+    Spotify results come with the first page only. stream=ndjson or stream=sse
+    sends each source's results as soon as they arrive.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    if limit > 50:
+        limit = 50
+    if sort not in SEARCH_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SEARCH_SORTS)}")
+    if stream is not None and stream not in SEARCH_STREAM_TYPES:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {', '.join(SEARCH_STREAM_TYPES)}")
+    after = None
+    if cursor is not None:
+        try:
+            after = database.decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        sort = 'popularity'
+    
+    # Spotify and SQLite are queried at the same time; SQLite runs off the event loop
+    sources = {}
+    if after is None:
+        sources['spotify'] = search_spotify_songs(query, limit)
+    sources['local'] = run_in_threadpool(search_local_songs, query, limit, sort, after)
+    if stream is not None:
+        return StreamingResponse(
+            stream_search(sources, stream),
+            media_type=SEARCH_STREAM_TYPES[stream],
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    results = dict(zip(sources, await asyncio.gather(*sources.values())))
+    local = results['local']
+    return {"results": results.get('spotify', []) + local['results'], "next_cursor": local['next_cursor']}
+
+@app.post("/recommend", dependencies=[Depends(require_ready)])
 async def recommend(request: RecommendRequest):
     """Get music recommendations based on a song"""
     try:
         logger.info(f"Received recommendation request for song: {request.song_name}")
-        query = f"track:{request.song_name}"
-        if request.artist_name:
-            query += f" artist:{request.artist_name}"
-        
-        logger.debug(f"Searching Spotify with query: {query}")
-        results = spotify.search(q=query, limit=1, type='track')
-        
-        if not results['tracks']['items']:
-            logger.warning(f"No tracks found for query: {query}")
-            raise HTTPException(status_code=404, detail="Song not found on Spotify")
-        
-        track = results['tracks']['items'][0]
-        logger.info(f"Found track: {track['name']} by {[a['name'] for a in track['artists']]}")
-        
-        # Try cache first if available
-        cache_key = f"rec_{track['id']}_{request.limit}"
+        # Keys include the model version and catalog size so a hot-swap or added songs never serve stale results
+        query_key = normalize_query(request.song_name, request.artist_name)
+        recommender = model_registry.current
+        cache_key = f"rec_{recommender.model_version}.{recommender.n_songs}_{query_key}_{request.limit}"
         cache_key = hashlib.md5(cache_key.encode()).hexdigest()
         
-        if redis_client:
-            try:
-                cached = redis_client.get(cache_key)
-                if cached:
-                    logger.info("Returning cached recommendations")
-                    return json.loads(cached)
-            except redis.RedisError as e:
-                logger.warning(f"Redis error: {str(e)}")
-        
+        # Cached responses are stored as the serialized body and returned as-is
+        with time_stage('/recommend', 'cache_get'):
+            body = recommendation_cache.get(cache_key)
+        if body is None:
+            # Identical requests in flight at the same time share one computation
+            body = await recommend_flight.do(
+                cache_key,
+                lambda: compute_recommendation(request.song_name, request.artist_name, request.limit, cache_key)
+            )
+        else:
+            logger.info("Returning cached recommendations")
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in recommend endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+async def compute_recommendation(song_name: str, artist_name: Optional[str], limit: int, cache_key: str) -> bytes:
+    """Build recommendations for a song and cache the serialized response.
+
+    Songs in the local catalog are answered from the model without calling
+    Spotify; others are resolved through Spotify search and audio features.
+    Runs detached from any single request, so it pins its own model and
+    database connection instead of borrowing the caller's.
+    """
+    with model_registry.acquire() as recommender:
+        result = await run_in_threadpool(recommend_catalog_song, recommender, song_name, artist_name, limit)
+    if result is None:
+        result = await recommend_spotify_song(song_name, artist_name, limit)
+    body = json.dumps(result, separators=(',', ':')).encode()
+    
+    # Cache the result
+    with time_stage('/recommend', 'cache_set'):
+        recommendation_cache.set(cache_key, body)
+    
+    logger.info("Successfully generated recommendations")
+    return body
+
+def recommendation_rows(rows: list, recommendation_data: dict) -> List[dict]:
+    """Song rows in recommendation order, each with its feature similarities; ids without a row are skipped"""
+    songs = {row['id']: dict(row) for row in rows}
+    return [
+        {**songs[idx], 'feature_similarities': similarities}
+        for idx, similarities in zip(recommendation_data['song_indices'], recommendation_data['feature_similarities'])
+        if idx in songs
+    ]
+
+def recommend_catalog_song(recommender: LightweightRecommender, song_name: str, artist_name: Optional[str],
+                           limit: int) -> Optional[dict]:
+    """Recommendations for a song in the local catalog, with no outbound calls; None if it is not there.
+
+    Blocks on the database and the model, so it runs in the threadpool.
+    """
+    with time_stage('/recommend', 'catalog_lookup'):
+        found = find_catalog_song(recommender, song_name, artist_name)
+    metrics.CACHE_LOOKUPS.labels('catalog_song', 'hit' if found else 'miss').inc()
+    if found is None:
+        return None
+    song_id, seed = found
+    logger.info(f"Found catalog song {song_id}: {seed['name']} by {seed['artists']}")
+    
+    with time_stage('/recommend', 'recommend'):
+        recommendation_data = recommender.recommend_for_song(song_id, n_recommendations=limit)
+    with time_stage('/recommend', 'db_lookup'):
+        rows = fetch_song_rows(recommendation_data['song_indices'])
+    input_song = {
+        'catalog_id': song_id,
+        'name': seed['name'],
+        'artists': database.parse_artists(seed['artists']),
+        'year': seed['year'],
+        'features': recommender.song_features(song_id)
+    }
+    return {'input_song': input_song, 'recommendations': recommendation_rows(rows, recommendation_data)}
+
+async def recommend_spotify_song(song_name: str, artist_name: Optional[str], limit: int) -> dict:
+    """Recommendations for a song resolved through Spotify search and audio features"""
+    try:
+        with time_stage('/recommend', 'spotify_search'):
+            track = await resolve_track(song_name, artist_name)
+    except Exception as e:
+        # Without a track there is nothing to recommend from; tell the client when to come back
+        reason = failure_reason(e)
+        logger.error(f"Spotify search failed ({reason}): {str(e)}")
+        metrics.FALLBACKS.labels(f"recommend_search_{reason}").inc()
+        retry_after = getattr(e, 'retry_after', None) or spotify.breaker.retry_after()
+        raise HTTPException(
+            status_code=503,
+            detail="Spotify search is temporarily unavailable",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+    if track is None:
+        raise HTTPException(status_code=404, detail="Song not found on Spotify")
+    logger.info(f"Found track: {track['name']} by {track['artists']}")
+    
+    with model_registry.acquire() as recommender:
         # Get features using client credentials (no user token required)
-        features = extract_spotify_features(track['id'])
+        with time_stage('/recommend', 'extract_features'):
+            features = await extract_spotify_features(track['id'])
         logger.debug(f"Extracted features: {features}")
         
         # Get recommendations from our model
         logger.debug("Requesting recommendations from model")
-        recommendation_data = recommender.recommend_from_features(
-            features,
-            year=int(track['album']['release_date'][:4]),
-            n_recommendations=request.limit
-        )
-        
-        similar_songs = recommendation_data['song_indices']
-        feature_similarities = recommendation_data['feature_similarities']
-        
-        # Get song details from database
-        conn = get_db()
-        cur = conn.cursor()
-        
-        placeholders = ','.join('?' * len(similar_songs))
-        cur.execute(f'SELECT * FROM songs WHERE id IN ({placeholders})', similar_songs)
-        
-        recommendations = []
-        for idx, row in enumerate(cur.fetchall()):
-            song_data = dict(row)
-            song_data['feature_similarities'] = feature_similarities[idx]
-            recommendations.append(song_data)
+        with time_stage('/recommend', 'recommend'):
+            recommendation_data = recommender.recommend_from_features(
+                features,
+                year=track['year'],
+                n_recommendations=limit
+            )
+    
+    # Get song details from database
+    with time_stage('/recommend', 'db_lookup'):
+        rows = await run_in_threadpool(fetch_song_rows, recommendation_data['song_indices'])
+    return {
+        'input_song': {**track, 'features': features},
+        'recommendations': recommendation_rows(rows, recommendation_data)
+    }
+
+async def resolve_batch_seed(seed: BatchSeed, recommender: LightweightRecommender):
+    """Resolve a batch seed to (result stub, features, track ID, year); features and track ID are None on error"""
+    if seed.features is not None:
+        missing = [f for f in recommender.base_features if f not in seed.features]
+        if missing:
+            return {'error': f"Missing features: {', '.join(missing)}"}, None, None, None
+        features = {f: seed.features[f] for f in recommender.base_features}
+        return {'input_song': {'features': features, 'year': seed.year}}, features, None, seed.year
+    if not seed.song_name:
+        return {'error': "Seed needs either song_name or features"}, None, None, None
+    
+    # Catalog songs carry their own features, so they need no Spotify calls
+    found = await run_in_threadpool(find_catalog_song, recommender, seed.song_name, seed.artist_name)
+    if found is not None:
+        song_id, row = found
+        features = recommender.song_features(song_id)
+        input_song = {
+            'catalog_id': song_id, 'name': row['name'], 'artists': database.parse_artists(row['artists']),
+            'year': row['year'], 'features': features
+        }
+        return {'input_song': input_song}, features, None, row['year']
+    
+    try:
+        track = await resolve_track(seed.song_name, seed.artist_name)
+    except Exception as e:
+        logger.error(f"Spotify search failed for batch seed {seed.song_name}: {str(e)}")
+        metrics.FALLBACKS.labels(f"batch_search_{failure_reason(e)}").inc()
+        return {'error': "Spotify search failed"}, None, None, None
+    if track is None:
+        return {'error': "Song not found on Spotify"}, None, None, None
+    
+    input_song = {key: track[key] for key in ('id', 'name', 'artists', 'year')}
+    # Features for track seeds are filled in by one bulk fetch across the batch
+    return {'input_song': input_song}, None, track['id'], track['year']
+
+@app.post("/recommend/batch", dependencies=[Depends(require_ready)])
+async def recommend_batch(
+    request: BatchRecommendRequest,
+    recommender: LightweightRecommender = Depends(get_recommender)
+):
+    """Get recommendations for many seed songs or feature dicts in one call"""
+    if not request.seeds:
+        raise HTTPException(status_code=400, detail="No seeds provided")
+    if len(request.seeds) > MAX_BATCH_SEEDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SEEDS} seeds per batch")
+    try:
+        logger.info(f"Received batch recommendation request with {len(request.seeds)} seeds")
+        # Resolve every seed to a feature dict concurrently; failures are reported per seed
+        with time_stage('/recommend/batch', 'spotify_search'):
+            resolved = await asyncio.gather(*(resolve_batch_seed(seed, recommender) for seed in request.seeds))
+        with time_stage('/recommend/batch', 'extract_features'):
+            track_features = await extract_spotify_features_many(
+                [track_id for _, _, track_id, _ in resolved if track_id is not None]
+            )
+        results = []
+        query_features, query_years, query_slots = [], [], []
+        for slot, (result, features, track_id, year) in enumerate(resolved):
+            results.append(result)
+            if track_id is not None:
+                features = track_features[track_id]
+                result['input_song']['features'] = features
+            if features is not None:
+                query_features.append(features)
+                query_years.append(year)
+                query_slots.append(slot)
         
-        conn.close()
+        # One vectorized model call for all resolved seeds; with hundreds of seeds it takes
+        # long enough to stall every other request, so it runs off the event loop
+        with time_stage('/recommend/batch', 'recommend'):
+            recommendation_data = await run_in_threadpool(
+                recommender.recommend_batch,
+                query_features,
+                query_years,
+                n_recommendations=request.limit
+            )
         
-        # Prepare response
-        result = {
-            'input_song': {
-                'id': track['id'],
-                'name': track['name'],
-                'artists': [artist['name'] for artist in track['artists']],
-                'year': int(track['album']['release_date'][:4]),
-                'features': features,
-                'preview_url': track['preview_url'],
-                'external_url': track['external_urls']['spotify']
-            },
-            'recommendations': recommendations
-        }
+        # One database round-trip for the union of all recommended songs
+        song_ids = sorted({idx for data in recommendation_data for idx in data['song_indices']})
+        with time_stage('/recommend/batch', 'db_lookup'):
+            songs = {row['id']: dict(row) for row in await run_in_threadpool(fetch_song_rows, song_ids)}
         
-        # Cache the result
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, 3600, json.dumps(result))
-                logger.debug("Cached recommendations successfully")
-            except redis.RedisError as e:
-                logger.warning(f"Failed to cache results: {str(e)}")
+        for slot, data in zip(query_slots, recommendation_data):
+            recommendations = []
+            for idx, similarities in zip(data['song_indices'], data['feature_similarities']):
+                if idx in songs:
+                    recommendations.append({**songs[idx], 'feature_similarities': similarities})
+            results[slot]['recommendations'] = recommendations
         
-        logger.info("Successfully generated recommendations")
-        return result
+        logger.info(f"Generated batch recommendations for {len(query_slots)} seeds")
+        return {'results': results}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in recommend endpoint: {str(e)}", exc_info=True)
+        logger.error(f"Unexpected error in batch recommend endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
-@app.get("/personalized-recommendations")
-async def personalized_recommendations(limit: int = 10, spotify_client: spotipy.Spotify = Depends(get_user_spotify_client)):
-    """Get personalized recommendations based on user's top tracks"""
+async def resolve_user_id(token: str) -> str:
+    """Spotify user ID for a token, shared by every worker through the user response cache"""
+    cache_key = user_cache_key(token, 'user_id')
+    user_id = user_cache.get(cache_key)
+    if user_id is None:
+        # A cached /me body already names the user; otherwise fetch it and cache it for /me too
+        me_key = user_cache_key(token, 'me')
+        body = user_cache.get(me_key)
+        if body is None:
+            body = json.dumps(await spotify.me(token), separators=(',', ':')).encode()
+            user_cache.set(me_key, body, ME_CACHE_TTL)
+        user_id = json.loads(body)['id'].encode()
+        user_cache.set(cache_key, user_id, USER_ID_TTL)
+    return user_id.decode()
+
+async def load_taste_profile(token: str) -> Optional[dict]:
+    """Get the user's cached taste profile, building or topping it up when due"""
+    cache_key = f"profile_{await resolve_user_id(token)}"
+    cached = profile_cache.get(cache_key)
+    profile = json.loads(cached) if cached else None
+    now = time.time()
+    
+    if profile is None or now - profile['built_at'] > PROFILE_REBUILD_AFTER:
+        ranges = await asyncio.gather(*(
+            spotify.current_user_top_tracks(token, limit=50, time_range=time_range)
+            for time_range in PROFILE_TIME_RANGES
+        ))
+        tracks = [track for top_tracks in ranges for track in top_tracks['items']]
+        if not tracks:
+            return None
+        # Profiles are cached for weeks, so they are only built from real features
+        features_by_id = await extract_spotify_features_many([track['id'] for track in tracks], fallback=False)
+        if not any(track['id'] in features_by_id for track in tracks):
+            raise HTTPException(status_code=503, detail="Audio features are temporarily unavailable")
+        profile = build_profile(tracks, features_by_id)
+    elif now - profile['updated_at'] > PROFILE_REFRESH_AFTER:
+        recent = (await spotify.current_user_top_tracks(token, limit=50, time_range="short_term"))['items']
+        seen = set(profile['track_ids'])
+        features_by_id = await extract_spotify_features_many(
+            [t['id'] for t in recent if t['id'] not in seen], fallback=False
+        )
+        profile = update_profile(profile, recent, features_by_id)
+    else:
+        return profile
+    
+    profile_cache.set(cache_key, json.dumps(profile, separators=(',', ':')).encode())
+    return profile
+
+@app.get("/personalized-recommendations", dependencies=[Depends(require_ready)])
+async def personalized_recommendations(
+    limit: int = 10,
+    token: str = Depends(get_user_token),
+    recommender: LightweightRecommender = Depends(get_recommender)
+):
+    """Get personalized recommendations from the user's multi-centroid taste profile"""
     try:
-        top_tracks = spotify_client.current_user_top_tracks(limit=5, time_range="medium_term")
-        if not top_tracks['items']:
+        with time_stage('/personalized-recommendations', 'taste_profile'):
+            profile = await load_taste_profile(token)
+        if profile is None:
             raise HTTPException(status_code=404, detail="No top tracks found for this user")
-        all_features = []
-        for track in top_tracks['items']:
-            features = extract_spotify_features(track['id'])
-            all_features.append(features)
-        avg_features = {
-            'acousticness': sum(f['acousticness'] for f in all_features) / len(all_features),
-            'liveness': sum(f['liveness'] for f in all_features) / len(all_features),
-            'valence': sum(f['valence'] for f in all_features) / len(all_features),
-            'tempo': sum(f['tempo'] for f in all_features) / len(all_features)
-        }
-        recommendation_data = recommender.recommend_from_features(avg_features, n_recommendations=limit)
-        similar_songs = recommendation_data['song_indices']
-        feature_similarities = recommendation_data['feature_similarities']
-        conn = get_db()
-        cur = conn.cursor()
-        placeholders = ','.join('?' * len(similar_songs))
-        cur.execute(f'SELECT * FROM songs WHERE id IN ({placeholders})', similar_songs)
-        recommendations = []
-        for idx, row in enumerate(cur.fetchall()):
-            song_data = dict(row)
-            song_data['feature_similarities'] = feature_similarities[idx]
-            recommendations.append(song_data)
-        conn.close()
+        clusters = profile['clusters']
+        
+        # One batched model call for all centroids
+        with time_stage('/personalized-recommendations', 'recommend'):
+            recommendation_data = recommender.recommend_batch(
+                [cluster['centroid'] for cluster in clusters],
+                n_recommendations=limit
+            )
+        song_ids = sorted({idx for data in recommendation_data for idx in data['song_indices']})
+        with time_stage('/personalized-recommendations', 'db_lookup'):
+            songs = {row['id']: dict(row) for row in await run_in_threadpool(fetch_song_rows, song_ids)}
+        
+        ranked_lists = [
+            [
+                {**songs[idx], 'feature_similarities': similarities}
+                for idx, similarities in zip(data['song_indices'], data['feature_similarities'])
+                if idx in songs
+            ]
+            for data in recommendation_data
+        ]
+        recommendations = diversify(ranked_lists, [cluster['count'] for cluster in clusters], limit)
         return {
-            'based_on': [t['name'] for t in top_tracks['items']],
-            'average_features': avg_features,
+            'based_on': [name for cluster in clusters for name in cluster['examples']],
+            'average_features': profile_average(profile),
+            'profile': {'clusters': clusters, 'updated_at': profile['updated_at']},
             'recommendations': recommendations
         }
     except HTTPException:
@@ -409,6 +1025,122 @@ async def personalized_recommendations(limit: int = 10, spotify_client: spotipy.
         logger.error(f"Failed to get personalized recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get personalized recommendations: {str(e)}")
 
+class ReloadModelRequest(BaseModel):
+    version: Optional[str] = None
+
+class NewSong(BaseModel):
+    name: str
+    artists: List[str]
+    year: int
+    popularity: Optional[float] = 0.0
+    features: Dict[str, float]
+
+class AddSongsRequest(BaseModel):
+    songs: List[NewSong]
+
+def check_admin_token(x_admin_token: Optional[str]):
+    """Reject requests without the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/admin/reload-model")
+async def reload_model(request: ReloadModelRequest, x_admin_token: Optional[str] = Header(None)):
+    """Load a model version in the background and swap it in without downtime"""
+    check_admin_token(x_admin_token)
+    if model_reload_lock.locked():
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    
+    async with model_reload_lock:
+        model_dir = resolve_model_dir(MODELS_ROOT, request.version)
+        if not os.path.isdir(model_dir):
+            raise HTTPException(status_code=404, detail=f"Model directory not found: {model_dir}")
+        try:
+            new_recommender, previous_version = await swap_model(model_dir)
+        except Exception as e:
+            logger.error(f"Failed to load model from {model_dir}: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
+    
+    return {
+        'previous_version': previous_version,
+        'model_version': new_recommender.model_version,
+        'manifest': new_recommender.manifest
+    }
+
+def add_catalog_songs(songs: List[dict]) -> tuple:
+    """Give new songs the next catalog ids and record them in the delta log, the songs table and the serving model"""
+    with model_registry.acquire() as recommender:
+        delta_log = delta_log_for(recommender)
+        with delta_log.lock():
+            # Replay other workers' additions first so the next id is current
+            catch_up_delta(recommender)
+            first_id = recommender.n_songs
+            entries = [{**song, 'id': first_id + i} for i, song in enumerate(songs)]
+            offset = delta_log.append(entries)
+            with db_pool.connection() as conn:
+                database.insert_songs(conn, entries)
+            ids = recommender.add_songs(entries)
+            recommender.delta_log_offset = offset
+        return ids, recommender.delta_size
+
+@app.post("/admin/songs", dependencies=[Depends(require_ready)])
+async def add_songs(request: AddSongsRequest, x_admin_token: Optional[str] = Header(None)):
+    """Add songs to the catalog while serving; they are recommendable as soon as this returns"""
+    check_admin_token(x_admin_token)
+    if not request.songs:
+        raise HTTPException(status_code=400, detail="No songs provided")
+    if len(request.songs) > MAX_ADDED_SONGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ADDED_SONGS} songs per request")
+    base_features = model_registry.current.base_features
+    for i, song in enumerate(request.songs):
+        missing = [f for f in base_features if f not in song.features]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Song {i} is missing features: {', '.join(missing)}")
+    
+    # Artists are stored in the same list form as the rest of the catalog
+    songs = [{
+        'name': song.name,
+        'artists': str(song.artists),
+        'year': song.year,
+        'popularity': song.popularity,
+        'features': {f: song.features[f] for f in base_features}
+    } for song in request.songs]
+    try:
+        ids, delta_size = await run_in_threadpool(add_catalog_songs, songs)
+    except Exception as e:
+        logger.error(f"Failed to add songs: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to add songs: {str(e)}")
+    
+    compaction_started = delta_size >= DELTA_COMPACT_THRESHOLD and not compaction_lock.locked()
+    if compaction_started:
+        asyncio.create_task(compact_in_background())
+    return {'ids': ids, 'delta_size': delta_size, 'compaction_started': compaction_started}
+
+@app.post("/admin/compact", dependencies=[Depends(require_ready)])
+async def compact(x_admin_token: Optional[str] = Header(None)):
+    """Fold songs added since the last build into a new model version now"""
+    check_admin_token(x_admin_token)
+    if compaction_lock.locked():
+        raise HTTPException(status_code=409, detail="A compaction is already in progress")
+    try:
+        version = await compact_catalog()
+    except Exception as e:
+        logger.error(f"Catalog compaction failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {str(e)}")
+    return {'compacted': version is not None, 'model_version': version}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit ratios and sizes of the recommendation cache tiers"""
+    return recommendation_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Expose request, stage, cache and Spotify metrics in Prometheus text format"""
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc):
     logger.error(f"Unhandled exception: {exc}")
@@ -416,3 +1148,5 @@ async def global_exception_handler(request: Request, exc):
         status_code=500,
         content={"detail": "An unexpected error occurred"}
     )
+
+readiness.record('import', time.monotonic() - IMPORT_STARTED)
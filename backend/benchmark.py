@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import database
+from recommender import LightweightRecommender, resolve_model_dir
+
+def sample_queries(recommender: LightweightRecommender, n_queries: int, seed: int = 42) -> np.ndarray:
+    """Draw scaled queries near real catalog songs so they follow the data distribution"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(recommender.features), size=n_queries, replace=len(recommender.features) < n_queries)
+    queries = np.asarray(recommender.features[rows], dtype=np.float32)
+    return queries + rng.normal(0, 0.05, size=queries.shape).astype(np.float32)
+
+def percentiles(samples_ms) -> dict:
+    return {
+        'p50_ms': float(np.percentile(samples_ms, 50)),
+        'p95_ms': float(np.percentile(samples_ms, 95)),
+        'p99_ms': float(np.percentile(samples_ms, 99)),
+    }
+
+def compare_engines(model_path: str = 'models', n_queries: int = 1000, k: int = 20,
+                    search_k: int = None, batch_size: int = 256) -> dict:
+    """Compare Annoy and exact search on latency and recall@k against exact neighbours"""
+    recommender = LightweightRecommender()
+    recommender.load_model(resolve_model_dir(model_path))
+    queries = sample_queries(recommender, n_queries)
+    results = {'n_songs': len(recommender.features), 'n_queries': n_queries, 'k': k}
+
+    # Exact results double as the ground truth for recall
+    truth = recommender.search_candidates(queries, k, engine='exact')
+    for engine in ('annoy', 'exact'):
+        single_ms = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            hit = recommender.search_candidates(query[None, :], k, search_k=search_k, engine=engine)[0]
+            single_ms.append((time.perf_counter() - start) * 1000)
+            found.append(hit[0])
+
+        start = time.perf_counter()
+        for batch_start in range(0, n_queries, batch_size):
+            recommender.search_candidates(queries[batch_start:batch_start + batch_size], k,
+                                          search_k=search_k, engine=engine)
+        batch_total_ms = (time.perf_counter() - start) * 1000
+
+        recall = np.mean([
+            len(set(ids) & set(true_ids)) / max(len(true_ids), 1)
+            for ids, (true_ids, _) in zip(found, truth)
+        ])
+        results[engine] = {
+            'single_query': percentiles(single_ms),
+            'batch_per_query_ms': batch_total_ms / n_queries,
+            f'recall@{k}': float(recall),
+        }
+    return results
+
+def print_engine_comparison(results: dict):
+    print(f"Catalog: {results['n_songs']:,} songs, {results['n_queries']} queries, k={results['k']}")
+    recall_key = f"recall@{results['k']}"
+    for engine in ('annoy', 'exact'):
+        stats = results[engine]
+        single = stats['single_query']
+        print(
+            f"{engine:>6}: single p50 {single['p50_ms']:.3f}ms p95 {single['p95_ms']:.3f}ms "
+            f"p99 {single['p99_ms']:.3f}ms | batch {stats['batch_per_query_ms']:.3f}ms/query | "
+            f"{recall_key} {stats[recall_key]:.4f}"
+        )
+
+def make_synthetic_catalog(path: str, n_songs: int, seed: int = 42):
+    """Write a reproducible catalog with the columns the model and evaluation need"""
+    rng = np.random.default_rng(seed)
+    n_artists = max(1, n_songs // 20)
+    pd.DataFrame({
+        'name': [f'Song {i}' for i in range(n_songs)],
+        'artists': [str([f'Artist {a}']) for a in rng.integers(0, n_artists, n_songs)],
+        'year': rng.integers(1921, 2021, n_songs),
+        'popularity': rng.integers(0, 100, n_songs),
+        'acousticness': rng.beta(0.7, 0.7, n_songs),
+        'liveness': rng.beta(1.5, 6.0, n_songs),
+        'valence': rng.beta(2.0, 2.0, n_songs),
+        'tempo': np.clip(rng.normal(118, 30, n_songs), 50, 250),
+    }).to_csv(path, index=False)
+
+def parse_artists(value) -> frozenset:
+    return frozenset(database.parse_artists(value))
+
+def evaluate_quality(recommender: LightweightRecommender, catalog: pd.DataFrame, seeds: np.ndarray, k: int) -> dict:
+    """Offline quality of full recommendations for catalog seed songs.
+
+    precision@k counts recommendations sharing an artist with the seed (the
+    seed itself excluded); coverage is the share of the catalog recommended
+    for at least one seed.
+    """
+    features_list = catalog.loc[seeds, recommender.base_features].to_dict('records')
+    years = catalog.loc[seeds, 'year'].astype(int).tolist()
+    results = recommender.recommend_batch(features_list, years, n_recommendations=k + 1)
+    artists = catalog['artists'].map(parse_artists)
+
+    hits, total, recommended = 0, 0, set()
+    for seed, result in zip(seeds, results):
+        song_ids = [idx for idx in result['song_indices'] if idx != seed][:k]
+        recommended.update(song_ids)
+        hits += sum(1 for idx in song_ids if artists.iloc[idx] & artists.iloc[seed])
+        total += len(song_ids)
+    return {
+        f'precision@{k}': hits / max(total, 1),
+        'coverage': len(recommended) / len(catalog),
+    }
+
+def evaluate_recall(recommender: LightweightRecommender, queries: np.ndarray, years: list, k: int) -> dict:
+    """Recall of the engine's candidates against exact neighbours, globally and era-aware"""
+    def recall(found, truth):
+        return float(np.mean([
+            len(set(ids) & set(true_ids)) / max(len(true_ids), 1)
+            for (ids, _), (true_ids, _) in zip(found, truth)
+        ]))
+    return {
+        f'recall@{k}': recall(
+            recommender.search_candidates(queries, k),
+            recommender.search_candidates(queries, k, engine='exact')
+        ),
+        f'era_recall@{k}': recall(
+            recommender.search_candidates(queries, k, years=years),
+            recommender.search_candidates(queries, k, engine='exact', years=years)
+        ),
+    }
+
+def evaluate_latency(recommender: LightweightRecommender, features_list: list, years: list,
+                     k: int, batch_size: int) -> dict:
+    """Latency percentiles of single recommend_from_features calls and batched calls"""
+    recommender.recommend_batch(features_list[:batch_size], years[:batch_size], n_recommendations=k)  # Warm up
+    single_ms = []
+    for features, year in zip(features_list, years):
+        start = time.perf_counter()
+        recommender.recommend_from_features(features, year=year, n_recommendations=k)
+        single_ms.append((time.perf_counter() - start) * 1000)
+
+    batch_ms = []
+    for start_row in range(0, len(features_list), batch_size):
+        start = time.perf_counter()
+        recommender.recommend_batch(
+            features_list[start_row:start_row + batch_size],
+            years[start_row:start_row + batch_size],
+            n_recommendations=k
+        )
+        batch_ms.append((time.perf_counter() - start) * 1000)
+    return {
+        'single_query': percentiles(single_ms),
+        'batch': {**percentiles(batch_ms), 'batch_size': batch_size,
+                  'per_query_ms': float(np.sum(batch_ms) / len(features_list))},
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(data_path: str = None, synthetic_songs: int = None, n_queries: int = 500, k: int = 10,
+              n_trees: int = 50, batch_size: int = 64, seed: int = 42) -> dict:
+    """Build a model from scratch and measure build cost, quality, recall and latency per engine"""
+    with tempfile.TemporaryDirectory() as workdir:
+        if synthetic_songs:
+            data_path = os.path.join(workdir, 'synthetic.csv')
+            make_synthetic_catalog(data_path, synthetic_songs, seed)
+        model_path = os.path.join(workdir, 'model')
+
+        builder = LightweightRecommender()
+        start = time.perf_counter()
+        build_stats = builder.build_model(data_path, model_path, n_trees=n_trees)
+        build_stats['total_s'] = round(time.perf_counter() - start, 3)
+        builder.unload()
+
+        # Same reader as the build, so Parquet files and partitioned directories work too
+        catalog = pd.concat(
+            builder._iter_feature_chunks(data_path, 100000, builder.base_features + ['year', 'artists']),
+            ignore_index=True
+        )
+        rng = np.random.default_rng(seed)
+        seeds = rng.choice(len(catalog), size=min(n_queries, len(catalog)), replace=False)
+        features_list = catalog.loc[seeds, builder.base_features].to_dict('records')
+        years = catalog.loc[seeds, 'year'].astype(int).tolist()
+
+        results = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'params': {
+                'data': 'synthetic' if synthetic_songs else data_path,
+                'n_songs': len(catalog), 'n_queries': len(seeds), 'k': k,
+                'n_trees': n_trees, 'batch_size': batch_size, 'seed': seed,
+                'feature_weights': builder.feature_weights,
+            },
+            'build': build_stats,
+            'engines': {},
+        }
+        for engine in ('annoy', 'exact'):
+            recommender = LightweightRecommender(engine=engine)
+            recommender.load_model(model_path)
+            queries = recommender._prepare_queries(features_list)
+            results['engines'][engine] = {
+                **evaluate_quality(recommender, catalog, seeds, k),
+                **evaluate_recall(recommender, queries, years, k),
+                'latency': evaluate_latency(recommender, features_list, years, k, batch_size),
+            }
+            recommender.unload()
+    return results
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def print_suite(results: dict, baseline: dict = None):
+    """Print every numeric result, with the change against a baseline run when given"""
+    current = flatten({'build': results['build'], 'engines': results['engines']})
+    previous = flatten({'build': baseline['build'], 'engines': baseline['engines']}) if baseline else {}
+    for key, value in current.items():
+        line = f"{key:<55} {value:>12.4f}"
+        if key in previous and previous[key]:
+            line += f"  ({(value - previous[key]) / abs(previous[key]) * 100:+.1f}%)"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline recommender benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    engines_parser = subparsers.add_parser('engines', help="Compare Annoy and exact search on an existing model")
+    engines_parser.add_argument('--model-path', default='models')
+    engines_parser.add_argument('--queries', type=int, default=1000)
+    engines_parser.add_argument('-k', type=int, default=20)
+    engines_parser.add_argument('--search-k', type=int, default=None)
+    engines_parser.add_argument('--batch-size', type=int, default=256)
+
+    suite_parser = subparsers.add_parser('suite', help="Build a model and measure quality, recall, latency and build cost")
+    source = suite_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', help="Catalog CSV or Parquet, e.g. cleaned_data.csv")
+    source.add_argument('--synthetic', type=int, metavar='N_SONGS', help="Generate a reproducible synthetic catalog")
+    suite_parser.add_argument('--queries', type=int, default=500)
+    suite_parser.add_argument('-k', type=int, default=10)
+    suite_parser.add_argument('--n-trees', type=int, default=50)
+    suite_parser.add_argument('--batch-size', type=int, default=64)
+    suite_parser.add_argument('--seed', type=int, default=42)
+    suite_parser.add_argument('--output', help="Write results as JSON")
+    suite_parser.add_argument('--baseline', help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    if args.command == 'engines':
+        print_engine_comparison(compare_engines(
+            args.model_path,
+            n_queries=args.queries,
+            k=args.k,
+            search_k=args.search_k,
+            batch_size=args.batch_size
+        ))
+    else:
+        results = run_suite(
+            data_path=args.data,
+            synthetic_songs=args.synthetic,
+            n_queries=args.queries,
+            k=args.k,
+            n_trees=args.n_trees,
+            batch_size=args.batch_size,
+            seed=args.seed
+        )
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        print_suite(results, baseline)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
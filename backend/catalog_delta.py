@@ -0,0 +1,48 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import List, Tuple
+
+def delta_log_path(models_root: str, lineage: str) -> str:
+    """Path of the log shared by every model of a lineage"""
+    return os.path.join(models_root, f"delta-{lineage}.jsonl")
+
+class DeltaLog:
+    """Append-only JSON-lines log of songs added to the catalog since a model lineage was built.
+
+    Every worker replays it into its recommender's delta buffer. Appends take an
+    exclusive file lock, so ids assigned from the replayed state are unique
+    across processes. Each entry carries its song id, so a compacted model
+    skips the entries its index already covers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def lock(self):
+        """Hold the exclusive append lock"""
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def read(self, offset: int = 0) -> Tuple[List[dict], int]:
+        """Entries after a byte offset and the offset to resume from; a partly written last line is left for later"""
+        if not os.path.exists(self.path):
+            return [], offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        songs = [json.loads(line) for line in complete.splitlines() if line.strip()]
+        return songs, offset + len(complete)
+
+    def append(self, songs: List[dict]) -> int:
+        """Durably append entries (call under lock()); returns the new end offset"""
+        payload = ''.join(json.dumps(song, separators=(',', ':')) + '\n' for song in songs).encode()
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
@@ -0,0 +1,76 @@
+import time
+from typing import Optional
+
+import metrics
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open"""
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while, then let a single probe test it.
+
+    Closed: calls pass, and failure_threshold consecutive failures open the circuit.
+    Open: calls fail fast until reset_timeout, or a server-given Retry-After, elapses.
+    Half-open: one probe passes; its success closes the circuit, its failure reopens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probing = False
+        self._state = self.CLOSED
+        self._state_gauge = metrics.CIRCUIT_STATE.labels(name)
+        self._state_gauge.set(0)
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() >= self.opened_until:
+            return self.HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through"""
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            self._set_state(self.HALF_OPEN)
+            return
+        raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self._state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        """Count a failure; a server asking to back off (retry_after) opens the circuit at once"""
+        self._probing = False
+        self.failures += 1
+        if retry_after is not None or self._state != self.CLOSED or self.failures >= self.failure_threshold:
+            delay = retry_after if retry_after is not None else self.reset_timeout
+            self.opened_until = max(self.opened_until, time.monotonic() + delay)
+            self._set_state(self.OPEN)
+
+    def record_cancelled(self):
+        """A call was abandoned before it finished; neither success nor failure"""
+        self._probing = False
+
+    def _set_state(self, state: str):
+        self._state = state
+        self._state_gauge.set(self.STATE_VALUES[state])
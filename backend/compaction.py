@@ -0,0 +1,62 @@
+import argparse
+import fcntl
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from catalog_delta import DeltaLog, delta_log_path
+from recommender import LightweightRecommender, parse_rerank_weights, publish_model, resolve_model_dir
+
+def compact_published_model(models_root: str, min_delta: int = 1, engine: str = 'annoy',
+                            rerank_weights: Dict[str, float] = None, candidate_multiplier: int = 5) -> Optional[str]:
+    """Fold the published model's delta log into a new model version and publish it.
+
+    Returns the new version, or None if another compaction holds the lock or fewer
+    than min_delta songs are buffered. Serving workers are not touched; they pick
+    the new version up through models/CURRENT.
+    """
+    with open(os.path.join(models_root, ".compact.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("Another compaction is running")
+            return None
+        recommender = LightweightRecommender(engine=engine)
+        recommender.load_model(resolve_model_dir(models_root))
+        recommender.set_rerank_weights(rerank_weights or {})
+        recommender.candidate_multiplier = candidate_multiplier
+        # Every worker appends to the lineage's log, so it holds all songs added since the build
+        songs, _ = DeltaLog(delta_log_path(models_root, recommender.lineage)).read()
+        recommender.add_songs(songs)
+        try:
+            if recommender.delta_size < min_delta:
+                print(f"{recommender.delta_size} buffered songs, fewer than {min_delta}; nothing to compact")
+                return None
+            version = time.strftime('v%Y%m%d-%H%M%S')
+            recommender.compact(os.path.join(models_root, version))
+        finally:
+            recommender.unload()
+        publish_model(models_root, version)
+        return version
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact songs added while serving into a new published model version")
+    parser.add_argument('--models-root', default=os.getenv("MODELS_ROOT", "models"))
+    parser.add_argument('--min-delta', type=int, default=1, help="Only compact once this many songs are buffered")
+    parser.add_argument('--engine', default=os.getenv("RECOMMENDER_ENGINE", "annoy"))
+    parser.add_argument('--rerank-weights', default=os.getenv("RERANK_WEIGHTS", ""), help="scorer=weight,...")
+    parser.add_argument('--candidate-multiplier', type=int, default=int(os.getenv("RECOMMEND_CANDIDATE_MULTIPLIER", 5)))
+    args = parser.parse_args()
+
+    # Index builds are CPU-bound; leave the serving workers ahead in the scheduler
+    os.nice(10)
+    version = compact_published_model(
+        args.models_root,
+        min_delta=args.min_delta,
+        engine=args.engine,
+        rerank_weights=parse_rerank_weights(args.rerank_weights),
+        candidate_multiplier=args.candidate_multiplier
+    )
+    # The last line of output is the result, for callers that run this as a subprocess
+    print(json.dumps({'model_version': version}))
@@ -1,130 +1,346 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import json
+import os
+import shutil
+import time
 from ast import literal_eval
-from sklearn.preprocessing import StandardScaler
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+NUMERICAL_COLS = ['duration_ms', 'year', 'acousticness', 'danceability', 'energy',
+                  'instrumentalness', 'liveness', 'loudness', 'speechiness',
+                  'tempo', 'valence', 'mode', 'key', 'popularity']
+CATEGORICAL_COLS = ['name', 'explicit']
+TEMPO_RANGE = (50, 250)
+KEY_CATEGORIES = list(range(12))
+MODE_CATEGORIES = [0, 1]
+STATE_FILE = '_pipeline_state.json'
+
+def parse_artists(artists: pd.Series) -> pd.Series:
+    """Vectorized equivalent of literal_eval for artist list literals such as "['A', 'B']".
+
+    repr() only uses double quotes or escapes for names containing quotes or
+    backslashes; those rare rows fall back to literal_eval.
+    """
+    artists = artists.fillna('[]')
+    simple = ~artists.str.contains('["\\\\]', regex=True)
+    inner = artists[simple].str.slice(2, -2)
+    parsed = inner.str.split("', '")
+    empty = inner.index[inner == '']
+    if len(empty):
+        parsed.loc[empty] = pd.Series([[] for _ in empty], index=empty)
+    if not simple.all():
+        parsed = pd.concat([parsed, artists[~simple].map(literal_eval)]).reindex(artists.index)
+    return parsed
 
-# Read the dataset
-df = pd.read_csv('data.csv')
+# Pass 1: statistics that every row's transformation depends on
+def chunk_stats(chunk: pd.DataFrame, collect_values: bool) -> dict:
+    """Mergeable per-chunk statistics; raw values are only collected when medians must be computed"""
+    exploded = pd.DataFrame({
+        'artist': parse_artists(chunk['artists']),
+        'popularity': chunk['popularity']
+    }).explode('artist').dropna(subset=['artist'])
+    by_artist = exploded.groupby('artist')['popularity']
+    tempo = chunk['tempo'].dropna().clip(*TEMPO_RANGE).to_numpy(np.float64)
+    stats = {
+        'rows': len(chunk),
+        'nulls': chunk.isnull().sum(),
+        'artist_sum': by_artist.sum(),
+        'artist_count': by_artist.size(),
+        'artist_nulls': exploded['popularity'].isna().groupby(exploded['artist']).sum(),
+        'tempo_sum': tempo.sum(),
+        'tempo_sumsq': np.square(tempo).sum(),
+        'tempo_count': len(tempo),
+        'tempo_outliers': int(((chunk['tempo'] < TEMPO_RANGE[0]) | (chunk['tempo'] > TEMPO_RANGE[1])).sum())
+    }
+    if collect_values:
+        stats['values'] = {col: chunk[col].dropna().to_numpy(np.float64) for col in NUMERICAL_COLS}
+        stats['value_counts'] = {col: chunk[col].value_counts() for col in CATEGORICAL_COLS}
+    return stats
 
-# 1. Handle missing values
-def clean_data(df):
-    print("\nMissing Values Analysis:")
-    print(df.isnull().sum())
-    
+def merge_stats(all_stats: list, state: dict = None) -> dict:
+    """Combine chunk statistics into the parameters used to transform rows.
+
+    On an incremental run the fill values and tempo scaling come from the
+    state of the first run, and only the artist popularity means are updated.
+    """
+    if state is not None:
+        medians, modes = state['medians'], state['modes']
+    else:
+        medians = {
+            col: float(np.median(np.concatenate([s['values'][col] for s in all_stats])))
+            for col in NUMERICAL_COLS
+        }
+        modes = {}
+        for col in CATEGORICAL_COLS:
+            counts = pd.concat([s['value_counts'][col] for s in all_stats]).groupby(level=0).sum()
+            # Same tie-breaking as Series.mode(): the smallest of the most frequent values
+            top = counts[counts == counts.max()].index.min()
+            modes[col] = top.item() if hasattr(top, 'item') else top
+
+    # Missing popularity is filled with the median before it is averaged per artist
+    artist_sum = pd.concat([s['artist_sum'] for s in all_stats]).groupby(level=0).sum()
+    artist_nulls = pd.concat([s['artist_nulls'] for s in all_stats]).groupby(level=0).sum()
+    artist_sum = artist_sum.add(artist_nulls * medians['popularity'], fill_value=0)
+    artist_count = pd.concat([s['artist_count'] for s in all_stats]).groupby(level=0).sum()
+    if state is not None:
+        artist_sum = artist_sum.add(pd.Series(state['artist_sum']), fill_value=0)
+        artist_count = artist_count.add(pd.Series(state['artist_count']), fill_value=0)
+
+    if state is not None:
+        tempo_mean, tempo_std = state['tempo_mean'], state['tempo_std']
+    else:
+        tempo_fill = min(max(medians['tempo'], TEMPO_RANGE[0]), TEMPO_RANGE[1])
+        tempo_nulls = sum(int(s['nulls']['tempo']) for s in all_stats)
+        n = sum(s['tempo_count'] for s in all_stats) + tempo_nulls
+        total = sum(s['tempo_sum'] for s in all_stats) + tempo_nulls * tempo_fill
+        total_sq = sum(s['tempo_sumsq'] for s in all_stats) + tempo_nulls * tempo_fill ** 2
+        tempo_mean = total / n
+        tempo_std = float(np.sqrt(max(total_sq / n - tempo_mean ** 2, 0.0))) or 1.0
+
+    return {
+        'medians': medians,
+        'modes': modes,
+        'artist_sum': artist_sum,
+        'artist_count': artist_count,
+        'artist_popularity': artist_sum / artist_count,
+        'tempo_mean': tempo_mean,
+        'tempo_std': tempo_std
+    }
+
+# Pass 2: per-row transformations with the merged parameters
+def clean_data(df, medians, modes):
     # Fill missing numerical values with median
-    numerical_cols = ['duration_ms', 'year', 'acousticness', 'danceability', 'energy',
-                     'instrumentalness', 'liveness', 'loudness', 'speechiness', 
-                     'tempo', 'valence', 'mode', 'key', 'popularity']
-    df[numerical_cols] = df[numerical_cols].fillna(df[numerical_cols].median())
-    
+    df[NUMERICAL_COLS] = df[NUMERICAL_COLS].fillna(medians)
+
     # Fill missing categorical values with mode
-    categorical_cols = ['name', 'explicit']
-    df[categorical_cols] = df[categorical_cols].fillna(df[categorical_cols].mode().iloc[0])
-    
+    df[CATEGORICAL_COLS] = df[CATEGORICAL_COLS].fillna(modes)
+
     # Handle artists column (convert string representations to lists)
-    df['artists'] = df['artists'].fillna('[]')
-    df['artists'] = df['artists'].apply(lambda x: literal_eval(x) if isinstance(x, str) else x)
-    
+    df['artists'] = parse_artists(df['artists'])
+
     return df
 
-# 2. Handle outliers
 def handle_outliers(df):
-    print("\nOutlier Analysis:")
-    
-    # Handle tempo outliers
-    tempo_mask = (df['tempo'] >= 50) & (df['tempo'] <= 250)
-    outliers = len(df) - sum(tempo_mask)
-    print(f"Found {outliers} tempo outliers")
-    
-    # Replace outliers with boundary values
-    df.loc[df['tempo'] < 50, 'tempo'] = 50
-    df.loc[df['tempo'] > 250, 'tempo'] = 250
-    
+    # Replace tempo outliers with boundary values
+    df['tempo'] = df['tempo'].clip(*TEMPO_RANGE)
     return df
 
-def create_features(df):
+def create_features(df, artist_popularity):
     # Create era (decade) bins
-    df['era'] = (df['year'] // 10) * 10
-    df['era'] = df['era'].astype(str) + 's'
-    
-    # Calculate mean popularity per artist
-    # First, explode the artists list to get one row per artist
-    artist_pop = df.explode('artists')[['artists', 'popularity']]
-    artist_mean_pop = artist_pop.groupby('artists')['popularity'].mean()
-    
-    # Map back to original dataframe (using first artist for simplicity)
-    df['primary_artist'] = df['artists'].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else x)
-    df['artist_popularity'] = df['primary_artist'].map(artist_mean_pop)
-    
+    df['era'] = ((df['year'] // 10) * 10).astype(int).astype(str) + 's'
+
+    # Mean popularity per artist, mapped through the first artist
+    df['primary_artist'] = df['artists'].str[0]
+    df['artist_popularity'] = df['primary_artist'].map(artist_popularity)
+
     # Convert duration to minutes
     df['duration_min'] = df['duration_ms'] / (1000 * 60)
-    
+
     return df
 
-def normalize_features(df):
+def normalize_features(df, tempo_mean, tempo_std):
     # Scale loudness to [0,1] range
     df['loudness_scaled'] = (df['loudness'] + 60) / 60
     # Clip any values outside [0,1] range due to potential outliers
     df['loudness_scaled'] = df['loudness_scaled'].clip(0, 1)
-    
-    # Standardize tempo
-    scaler = StandardScaler()
-    df['tempo_standardized'] = scaler.fit_transform(df[['tempo']])
-    
+
+    # Standardize tempo with the statistics of the whole dataset
+    df['tempo_standardized'] = (df['tempo'] - tempo_mean) / tempo_std
+
     return df
 
 def prepare_for_modeling(df):
-    # One-hot encode key and mode
-    key_dummies = pd.get_dummies(df['key'], prefix='key')
-    mode_dummies = pd.get_dummies(df['mode'], prefix='mode')
-    
-    # Combine with original dataframe
-    df = pd.concat([df, key_dummies, mode_dummies], axis=1)
-    
+    # One-hot encode key and mode over fixed categories, so every chunk gets the same columns
+    key = pd.Series(pd.Categorical(df['key'].astype(int), categories=KEY_CATEGORIES), index=df.index)
+    mode = pd.Series(pd.Categorical(df['mode'].astype(int), categories=MODE_CATEGORIES), index=df.index)
+    df = pd.concat([df, pd.get_dummies(key, prefix='key'), pd.get_dummies(mode, prefix='mode')], axis=1)
+
     # Drop original columns
     df.drop(['key', 'mode'], axis=1, inplace=True)
-    
+
     return df
 
-def save_by_era(df, output_dir='processed_data'):
-    # Create output directory if it doesn't exist
-    import os
+def save_by_era(df, output_dir, part_name):
+    # One file per era and chunk under a hive-style era=<decade> partition directory
+    for era, era_df in df.groupby('era'):
+        era_dir = f'{output_dir}/era={era}'
+        os.makedirs(era_dir, exist_ok=True)
+        era_df.drop(columns='era').to_parquet(f'{era_dir}/{part_name}.parquet', index=False)
+
+_params = None
+
+def _init_worker(params):
+    global _params
+    _params = params
+
+def transform_chunk(chunk: pd.DataFrame, row_offset: int, output_dir: str, write_csv: bool):
+    """Transform one chunk, write its era partitions and return it as CSV text (or None)"""
+    df = clean_data(chunk, _params['medians'], _params['modes'])
+    df = handle_outliers(df)
+    df = create_features(df, _params['artist_popularity'])
+    df = normalize_features(df, _params['tempo_mean'], _params['tempo_std'])
+    df = prepare_for_modeling(df)
+    # row_id is the row's position in data.csv, i.e. its song id in cleaned_data.csv
+    df.insert(0, 'row_id', np.arange(row_offset, row_offset + len(df), dtype=np.int64))
+    save_by_era(df, output_dir, f'part-{row_offset:010d}')
+    if not write_csv:
+        return None, None
+    df = df.drop(columns='row_id')
+    return list(df.columns), df.to_csv(header=False, index=False)
+
+def bounded_map(executor, fn, iterable, max_pending):
+    """Ordered executor.map that keeps at most max_pending chunks in flight"""
+    pending = deque()
+    for args in iterable:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def load_state(output_dir, data_path, columns):
+    """State of the previous run, or None if data.csv was not simply appended to since"""
+    path = f'{output_dir}/{STATE_FILE}'
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state['columns'] != columns or os.path.getsize(data_path) < state['size']:
+        return None
+    return state
+
+def save_state(output_dir, data_path, columns, rows, params, csv_path):
+    state = {
+        'columns': columns,
+        'rows': rows,
+        'size': os.path.getsize(data_path),
+        'csv_path': csv_path,
+        'medians': params['medians'],
+        'modes': params['modes'],
+        'tempo_mean': params['tempo_mean'],
+        'tempo_std': params['tempo_std'],
+        'artist_sum': params['artist_sum'].to_dict(),
+        'artist_count': params['artist_count'].astype(int).to_dict(),
+        'updated_at': time.time()
+    }
+    with open(f'{output_dir}/{STATE_FILE}.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(f'{output_dir}/{STATE_FILE}.tmp', f'{output_dir}/{STATE_FILE}')
+
+def clear_outputs(output_dir):
+    """Remove era partitions and state from a previous full run"""
+    if not os.path.isdir(output_dir):
+        return
+    for entry in os.listdir(output_dir):
+        path = f'{output_dir}/{entry}'
+        if entry.startswith('era=') and os.path.isdir(path):
+            shutil.rmtree(path)
+        elif entry == STATE_FILE or (entry.startswith('songs_') and entry.endswith('.parquet')):
+            os.remove(path)
+
+def run_pipeline(data_path='data.csv', output_dir='processed_data', csv_path='cleaned_data.csv',
+                 chunk_size=50000, workers=None, full=False):
+    """Process new rows of data_path (all rows on the first or a --full run); returns rows processed"""
+    timings = {}
+    columns = list(pd.read_csv(data_path, nrows=0).columns)
+    state = None if full else load_state(output_dir, data_path, columns)
+    if state is not None and csv_path != state['csv_path']:
+        state = None
+    skip = state['rows'] if state else 0
+    if state is None:
+        clear_outputs(output_dir)
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Save data by era
-    for era in df['era'].unique():
-        era_df = df[df['era'] == era]
-        output_file = f'{output_dir}/songs_{era}.parquet'
-        era_df.to_parquet(output_file, index=False)
+
+    def read_chunks():
+        return pd.read_csv(data_path, chunksize=chunk_size, skiprows=range(1, skip + 1))
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        stage_start = time.perf_counter()
+        all_stats = list(bounded_map(
+            executor, chunk_stats, ((chunk, state is None) for chunk in read_chunks()), workers * 2
+        ))
+        new_rows = sum(s['rows'] for s in all_stats)
+        timings['statistics'] = time.perf_counter() - stage_start
+        if new_rows == 0:
+            print("No new rows to process")
+            return 0
+        print("\nMissing Values Analysis:")
+        print(sum(s['nulls'] for s in all_stats))
+        print(f"\nFound {sum(s['tempo_outliers'] for s in all_stats)} tempo outliers")
+        params = merge_stats(all_stats, state)
+        del all_stats
+
+    print(f"Processing {new_rows:,} {'new ' if state else ''}rows with {workers} workers...")
+    stage_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(params,)) as executor:
+        def tasks():
+            offset = skip
+            for chunk in read_chunks():
+                yield chunk, offset, output_dir, csv_path is not None
+                offset += len(chunk)
+
+        csv_file = None
+        if csv_path is not None:
+            csv_file = open(csv_path, 'a' if state else 'w', newline='')
+        try:
+            for i, (csv_columns, csv_text) in enumerate(bounded_map(executor, transform_chunk, tasks(), workers * 2)):
+                if csv_file is None:
+                    continue
+                if i == 0 and state is None:
+                    csv_file.write(','.join(csv_columns) + '\n')
+                csv_file.write(csv_text)
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+    timings['transform_and_write'] = time.perf_counter() - stage_start
+
+    save_state(output_dir, data_path, columns, skip + new_rows, params, csv_path)
+    print(f"Processed {new_rows:,} rows: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    return new_rows
+
+def load_processed(output_dir, columns):
+    """Read selected columns of the era-partitioned dataset"""
+    df = pd.read_parquet(output_dir, columns=[c for c in columns if c != 'era'] + (['era'] if 'era' in columns else []))
+    if 'era' in df:
+        df['era'] = df['era'].astype(str)
+    return df
 
 # 3. Create visualizations
 def create_visualizations(df):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Set a basic style that's guaranteed to work
     plt.style.use('default')
-    
+
     # 1. Distribution plots for audio features
     audio_features = ['acousticness', 'danceability', 'energy', 'instrumentalness',
                      'liveness', 'speechiness', 'valence', 'tempo']
-    
+
     fig, axes = plt.subplots(4, 2, figsize=(15, 20))
     axes = axes.ravel()
-    
+
     for idx, feature in enumerate(audio_features):
         sns.histplot(data=df, x=feature, ax=axes[idx], bins=30)
         axes[idx].set_title(f'Distribution of {feature}')
         axes[idx].set_xlabel(feature.capitalize())
         axes[idx].set_ylabel('Count')
-    
+
     plt.tight_layout()
     plt.savefig('audio_features_distribution.png')
     plt.close()
-    
+
     # 2. Correlation matrix
     correlation_features = audio_features + ['popularity', 'loudness']
     corr_matrix = df[correlation_features].corr()
-    
+
     plt.figure(figsize=(12, 10))
     sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0, fmt='.2f')
     plt.title('Correlation Matrix of Audio Features')
@@ -132,54 +348,64 @@ def create_visualizations(df):
     plt.savefig('correlation_matrix.png')
     plt.close()
 
-# Main execution
-def main():
-    # Read data
-    df = pd.read_csv('data.csv')
-    print("Initial shape:", df.shape)
-    
-    # Clean and transform data
-    df = clean_data(df)
-    df = handle_outliers(df)
-    
-    # Feature engineering and normalization
-    print("\nCreating new features and normalizing...")
-    df = create_features(df)
-    df = normalize_features(df)
-    df = prepare_for_modeling(df)
-    
-    # Create visualizations
-    create_visualizations(df)
-    
-    # Save processed data
-    print("\nSaving processed data...")
-    df.to_csv('cleaned_data.csv', index=False)
-    save_by_era(df)
-    
-    # Update EDA report
+def write_report(df, plots):
     with open('eda_report.txt', 'w') as f:
         f.write("Exploratory Data Analysis Report\n")
         f.write("================================\n\n")
-        
+
         f.write("1. Dataset Overview\n")
         f.write(f"Total number of songs: {len(df):,}\n")
         f.write(f"Time period: {df['year'].min()} - {df['year'].max()}\n\n")
-        
+
         f.write("2. Audio Features Summary\n")
         f.write(df[['acousticness', 'danceability', 'energy', 'instrumentalness',
                    'liveness', 'speechiness', 'tempo_standardized', 'valence']].describe().to_string())
         f.write("\n\n")
-        
+
         f.write("3. Key Findings\n")
         f.write(f"- Average song popularity: {df['popularity'].mean():.2f}\n")
         f.write(f"- Median artist popularity: {df['artist_popularity'].median():.2f}\n")
         f.write(f"- Average duration (minutes): {df['duration_min'].mean():.2f}\n")
         f.write(f"- Most common era: {df['era'].mode().iloc[0]}\n")
-        
+
         f.write("\n4. Visualization Summary\n")
-        f.write("- Distribution plots have been saved as 'audio_features_distribution.png'\n")
-        f.write("- Correlation matrix has been saved as 'correlation_matrix.png'\n")
+        if plots:
+            f.write("- Distribution plots have been saved as 'audio_features_distribution.png'\n")
+            f.write("- Correlation matrix has been saved as 'correlation_matrix.png'\n")
         f.write("- Processed data saved by era in 'processed_data' directory\n")
 
+# Main execution
+def main():
+    parser = argparse.ArgumentParser(description="Clean data.csv into cleaned_data.csv and era-partitioned Parquet")
+    parser.add_argument('--data', default='data.csv')
+    parser.add_argument('--output-dir', default='processed_data')
+    parser.add_argument('--csv', default='cleaned_data.csv', help="Wide CSV output path")
+    parser.add_argument('--no-csv', action='store_true', help="Only write the Parquet partitions")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--full', action='store_true', help="Reprocess every row instead of only new ones")
+    parser.add_argument('--skip-plots', action='store_true', help="Do not render matplotlib figures")
+    args = parser.parse_args()
+
+    new_rows = run_pipeline(
+        args.data,
+        args.output_dir,
+        None if args.no_csv else args.csv,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        full=args.full
+    )
+    if new_rows == 0:
+        return
+
+    # The report and plots only need a few columns of the processed dataset
+    report_columns = ['acousticness', 'danceability', 'energy', 'instrumentalness', 'liveness',
+                      'speechiness', 'valence', 'tempo', 'tempo_standardized', 'popularity',
+                      'loudness', 'year', 'artist_popularity', 'duration_min', 'era']
+    df = load_processed(args.output_dir, report_columns)
+    if not args.skip_plots:
+        create_visualizations(df)
+    write_report(df, plots=not args.skip_plots)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,435 @@
+import base64
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from ast import literal_eval
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from feature_store import normalize_query, normalize_text
+
+logger = logging.getLogger(__name__)
+
+SONG_INDEXES = {
+    'idx_songs_popularity': 'songs (popularity DESC)',
+    'idx_songs_year': 'songs (year)',
+    'idx_songs_name': 'songs (name)',
+}
+
+# Weight of popularity (0-100) against BM25 relevance when ranking text search results
+SEARCH_POPULARITY_WEIGHT = 0.05
+
+# Keep the full-text index in sync with songs on every write
+SONG_FTS_TRIGGERS = {
+    'songs_fts_insert': '''
+        CREATE TRIGGER IF NOT EXISTS songs_fts_insert AFTER INSERT ON songs BEGIN
+            INSERT INTO songs_fts (rowid, name, artists) VALUES (new.id, new.name, new.artists);
+        END
+    ''',
+    'songs_fts_delete': '''
+        CREATE TRIGGER IF NOT EXISTS songs_fts_delete AFTER DELETE ON songs BEGIN
+            INSERT INTO songs_fts (songs_fts, rowid, name, artists) VALUES ('delete', old.id, old.name, old.artists);
+        END
+    ''',
+    'songs_fts_update': '''
+        CREATE TRIGGER IF NOT EXISTS songs_fts_update AFTER UPDATE ON songs BEGIN
+            INSERT INTO songs_fts (songs_fts, rowid, name, artists) VALUES ('delete', old.id, old.name, old.artists);
+            INSERT INTO songs_fts (rowid, name, artists) VALUES (new.id, new.name, new.artists);
+        END
+    ''',
+}
+
+# Keep the most popular song for each lookup key
+UPSERT_SONG_KEY_SQL = '''
+    INSERT INTO song_keys (key, id, popularity) VALUES (?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET id = excluded.id, popularity = excluded.popularity
+    WHERE excluded.popularity > song_keys.popularity
+'''
+
+# One statement text for any number of ids, so every pooled connection reuses
+# its prepared statement; rows come back in the order the ids were given
+FETCH_SONGS_SQL = '''
+    SELECT songs.* FROM json_each(?) AS ids
+    JOIN songs ON songs.id = ids.value
+    ORDER BY ids.key
+'''
+
+class ConnectionPool:
+    """Bounded pool of long-lived, read-optimized SQLite connections"""
+
+    def __init__(self, db_path: str, size: int = 8, mmap_size: int = 256 * 1024 * 1024,
+                 cache_size_kb: int = 16384, timeout: float = 5.0):
+        self.db_path = db_path
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        # Connections must never cross a fork, so each process starts with an empty pool
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a writer commits
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one while under the pool size"""
+        if self._pid != os.getpid():
+            self._reset()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a pooled database connection")
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding any open transaction"""
+        if self._pid != os.getpid():
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close idle connections; used on shutdown"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+def fetch_songs(conn: sqlite3.Connection, song_ids: List[int]) -> list:
+    """Fetch song rows for the given ids, in the same order"""
+    if not song_ids:
+        return []
+    return conn.execute(FETCH_SONGS_SQL, (json.dumps([int(i) for i in song_ids]),)).fetchall()
+
+def init_schema(conn: sqlite3.Connection):
+    """Create the songs and catalog metadata tables if they do not exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS songs (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            artists TEXT,
+            year INTEGER,
+            popularity REAL
+        )
+    ''')
+    # Normalized (name, artist) and (name) lookup keys -> catalog song id
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS song_keys (
+            key TEXT PRIMARY KEY,
+            id INTEGER,
+            popularity REAL
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    init_search_index(conn)
+    conn.commit()
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    """Check whether the FTS5 index over songs exists"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'songs_fts'").fetchone()
+    return row is not None
+
+def init_search_index(conn: sqlite3.Connection):
+    """Create the FTS5 index over song names and artists, backfilling it for existing catalogs"""
+    if has_search_index(conn):
+        return
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE songs_fts USING fts5(
+                name,
+                artists,
+                content='songs',
+                content_rowid='id',
+                prefix='2 3',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 unavailable, search falls back to LIKE scans: {str(e)}")
+        return
+    for trigger in SONG_FTS_TRIGGERS.values():
+        conn.execute(trigger)
+    conn.execute("INSERT INTO songs_fts (songs_fts) VALUES ('rebuild')")
+
+def get_catalog_meta(conn: sqlite3.Connection, key: str):
+    """Return a catalog_meta value, if set"""
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def get_catalog_version(conn: sqlite3.Connection):
+    """Return the model version the songs table was loaded from, if any"""
+    return get_catalog_meta(conn, 'model_version')
+
+def set_catalog_version(conn: sqlite3.Connection, model_version: str, lineage: str = None):
+    """Record the model version (and lineage) the songs table matches; the caller commits"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)",
+        [('model_version', model_version), ('lineage', lineage)]
+    )
+
+def catalog_covers(conn: sqlite3.Connection, lineage: str, n_rows: int) -> bool:
+    """Check whether the songs table was loaded for this lineage and already holds its first n_rows ids.
+
+    A compacted model's catalog is its parent's plus songs that were inserted as
+    they were added, so such a table only needs its version updated.
+    """
+    if lineage is None or get_catalog_meta(conn, 'lineage') != lineage:
+        return False
+    return conn.execute('SELECT COUNT(*) FROM songs WHERE id < ?', (n_rows,)).fetchone()[0] == n_rows
+
+def catalog_is_current(conn: sqlite3.Connection, model_version: str) -> bool:
+    """Check whether the songs table is populated and matches the model version"""
+    if get_catalog_version(conn) != model_version:
+        return False
+    # Catalogs loaded before song lookup keys existed are reloaded once to add them
+    return conn.execute(
+        'SELECT EXISTS (SELECT 1 FROM songs) AND EXISTS (SELECT 1 FROM song_keys)'
+    ).fetchone()[0] == 1
+
+def bulk_load_songs(conn: sqlite3.Connection, chunks: Iterable[pd.DataFrame], model_version: str,
+                    lineage: str = None) -> int:
+    """Replace the songs table from DataFrame chunks using fast-import settings.
+
+    The whole replacement, including dropping and rebuilding the indexes, is one
+    transaction, so readers keep seeing the old table with its indexes until it commits.
+    """
+    start = time.perf_counter()
+
+    # Fast-import pragmas; durability is irrelevant while the table can be rebuilt from source.
+    # A WAL database may have live readers (hot model swaps), so it stays in WAL mode.
+    if conn.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+        conn.execute('PRAGMA journal_mode = MEMORY')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -65536')  # 64MB
+
+    # DDL does not open a transaction implicitly, so start it before dropping anything
+    conn.execute('BEGIN')
+    # Drop indexes and FTS triggers so rows are appended without per-row index maintenance
+    for index_name in SONG_INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {index_name}')
+    search_index = has_search_index(conn)
+    for trigger_name in SONG_FTS_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+    conn.execute('DELETE FROM songs')
+    conn.execute('DELETE FROM song_keys')
+
+    total_rows = 0
+    song_keys = {}
+    for chunk in chunks:
+        rows = list(zip(
+            chunk.index.tolist(),
+            chunk['name'].astype(str).tolist(),
+            chunk['artists'].astype(str).tolist(),
+            chunk['year'].astype(int).tolist(),
+            chunk['popularity'].astype(float).tolist()
+        ))
+        conn.executemany(
+            'INSERT INTO songs (id, name, artists, year, popularity) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
+        for key, song_id, popularity in song_key_rows(rows):
+            if key not in song_keys or popularity > song_keys[key][1]:
+                song_keys[key] = (song_id, popularity)
+        total_rows += len(chunk)
+    # Deduplicated in memory and inserted in key order, so the key index is appended to, not rebalanced
+    conn.executemany(
+        'INSERT INTO song_keys (key, id, popularity) VALUES (?, ?, ?)',
+        ((key, song_id, popularity) for key, (song_id, popularity) in sorted(song_keys.items()))
+    )
+    load_time = time.perf_counter() - start
+
+    # Building indexes once over sorted data is much cheaper than maintaining them per insert
+    for index_name, definition in SONG_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {definition}')
+    if search_index:
+        conn.execute("INSERT INTO songs_fts (songs_fts) VALUES ('rebuild')")
+        for trigger in SONG_FTS_TRIGGERS.values():
+            conn.execute(trigger)
+    set_catalog_version(conn, model_version, lineage)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA synchronous = NORMAL')
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Loaded {total_rows:,} songs in {elapsed:.2f}s "
+        f"({total_rows / max(load_time, 1e-9):,.0f} rows/s insert, {elapsed - load_time:.2f}s indexing)"
+    )
+    return total_rows
+
+def insert_songs(conn: sqlite3.Connection, songs: List[dict]) -> int:
+    """Add songs appended to the catalog after its bulk load; ids already present are left as they are"""
+    rows = [(song['id'], song['name'], song['artists'], song['year'], song['popularity']) for song in songs]
+    conn.executemany('INSERT OR IGNORE INTO songs (id, name, artists, year, popularity) VALUES (?, ?, ?, ?, ?)', rows)
+    conn.executemany(UPSERT_SONG_KEY_SQL, song_key_rows(rows))
+    conn.commit()
+    return len(songs)
+
+def parse_artists(value) -> List[str]:
+    """Artist names from a catalog value: a list literal such as "['A', 'B']", a plain name or a sequence"""
+    if isinstance(value, str):
+        return list(_parse_artist_literal(value))
+    return [str(artist) for artist in value]
+
+@lru_cache(maxsize=65536)
+def _parse_artist_literal(value: str) -> tuple:
+    # Artist strings repeat across a catalog, so parsed literals are cached
+    try:
+        artists = literal_eval(value)
+    except (ValueError, SyntaxError):
+        return (value,)
+    if isinstance(artists, (list, tuple)):
+        return tuple(str(artist) for artist in artists)
+    return (str(artists),)
+
+def song_key_rows(rows: Iterable[tuple]):
+    """(key, id, popularity) lookup rows for song rows: the name alone and the name with each artist,
+    keyed exactly as normalize_query keys a request"""
+    for song_id, name, artists, _, popularity in rows:
+        popularity = popularity or 0.0
+        song = normalize_text(name)
+        yield f"{song}\x1f", song_id, popularity
+        for artist in _normalized_artists(artists):
+            yield f"{song}\x1f{artist}", song_id, popularity
+
+@lru_cache(maxsize=65536)
+def _normalized_artists(artists: str) -> tuple:
+    return tuple(normalize_text(artist) for artist in parse_artists(artists))
+
+def find_song(conn: sqlite3.Connection, song_name: str, artist_name: str = None) -> Optional[int]:
+    """Catalog id of the most popular song matching a name and optional artist, or None"""
+    row = conn.execute('SELECT id FROM song_keys WHERE key = ?', (normalize_query(song_name, artist_name),)).fetchone()
+    return row[0] if row else None
+
+def build_match_query(query: str):
+    """Turn free text into an FTS5 query; the last term is a prefix for search-as-you-type"""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def search_songs(conn: sqlite3.Connection, query: str, limit: int) -> list:
+    """Search local songs by name or artist, ranked by BM25 relevance and popularity"""
+    if not has_search_index(conn):
+        cur = conn.execute('''
+            SELECT * FROM songs
+            WHERE name LIKE ? OR artists LIKE ?
+            ORDER BY popularity DESC
+            LIMIT ?
+        ''', (f'%{query}%', f'%{query}%', limit))
+        return cur.fetchall()
+
+    match_query = build_match_query(query)
+    if match_query is None:
+        return []
+    cur = conn.execute('''
+        SELECT songs.* FROM songs_fts
+        JOIN songs ON songs.id = songs_fts.rowid
+        WHERE songs_fts MATCH ?
+        ORDER BY bm25(songs_fts, 2.0, 1.0) - ? * songs.popularity
+        LIMIT ?
+    ''', (match_query, SEARCH_POPULARITY_WEIGHT, limit))
+    return cur.fetchall()
+
+def search_songs_page(conn: sqlite3.Connection, query: str, limit: int,
+                      after: Optional[Tuple[Optional[float], int]] = None) -> list:
+    """Search local songs by name or artist, most popular first, resuming after a (popularity, id) keyset.
+
+    The keyset filters matches before they are sorted, so a deep page costs about
+    the same as the first one instead of growing with an OFFSET.
+    """
+    keyset, keyset_params = '', ()
+    if after is not None:
+        popularity, song_id = after
+        if popularity is None:
+            # NULL popularity sorts last, so only NULL rows with smaller ids remain
+            keyset, keyset_params = 'AND songs.popularity IS NULL AND songs.id < ?', (song_id,)
+        else:
+            keyset = 'AND ((songs.popularity, songs.id) < (?, ?) OR songs.popularity IS NULL)'
+            keyset_params = (popularity, song_id)
+
+    if has_search_index(conn):
+        match_query = build_match_query(query)
+        if match_query is None:
+            return []
+        source = 'songs_fts JOIN songs ON songs.id = songs_fts.rowid WHERE songs_fts MATCH ?'
+        params = (match_query,)
+    else:
+        source = 'songs WHERE (songs.name LIKE ? OR songs.artists LIKE ?)'
+        params = (f'%{query}%', f'%{query}%')
+    cur = conn.execute(f'''
+        SELECT songs.* FROM {source} {keyset}
+        ORDER BY songs.popularity DESC, songs.id DESC
+        LIMIT ?
+    ''', (*params, *keyset_params, limit))
+    return cur.fetchall()
+
+def encode_search_cursor(row) -> str:
+    """Opaque cursor that resumes a popularity-ordered search after the given row"""
+    payload = json.dumps([row['popularity'], row['id']], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_search_cursor(cursor: str) -> Tuple[Optional[float], int]:
+    """The (popularity, id) keyset a cursor resumes after; raises ValueError for a malformed cursor"""
+    try:
+        popularity, song_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid search cursor: {cursor!r}") from e
+    if not isinstance(song_id, int) or not (popularity is None or isinstance(popularity, (int, float))):
+        raise ValueError(f"Invalid search cursor: {cursor!r}")
+    return popularity, song_id
@@ -0,0 +1,132 @@
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = ['acousticness', 'liveness', 'valence', 'tempo']
+
+class AudioFeatureStore:
+    """Persistent track ID -> audio features cache backed by a SQLite table"""
+
+    def __init__(self, pool, ttl: float = 90 * 24 * 3600):
+        self.pool = pool
+        self.ttl = ttl
+
+    def init_schema(self):
+        """Create the cache table if it does not exist"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS audio_features (
+                    track_id TEXT PRIMARY KEY,
+                    acousticness REAL,
+                    liveness REAL,
+                    valence REAL,
+                    tempo REAL,
+                    fetched_at REAL
+                )
+            ''')
+            conn.commit()
+
+    def get_many(self, track_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return cached, unexpired features for the given track IDs"""
+        track_ids = list(dict.fromkeys(track_ids))
+        if not track_ids:
+            return {}
+        oldest = time.time() - self.ttl
+        found = {}
+        try:
+            with self.pool.connection() as conn:
+                for start in range(0, len(track_ids), 900):
+                    chunk = track_ids[start:start + 900]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f'SELECT track_id, {", ".join(FEATURE_COLUMNS)} FROM audio_features '
+                        f'WHERE track_id IN ({placeholders}) AND fetched_at >= ?',
+                        (*chunk, oldest)
+                    ).fetchall()
+                    for row in rows:
+                        found[row[0]] = dict(zip(FEATURE_COLUMNS, row[1:]))
+        except sqlite3.Error as e:
+            logger.warning(f"Audio feature cache read failed: {str(e)}")
+        return found
+
+    def put_many(self, features_by_id: Dict[str, dict]):
+        """Store freshly fetched features"""
+        if not features_by_id:
+            return
+        now = time.time()
+        try:
+            with self.pool.connection() as conn:
+                conn.executemany(
+                    f'INSERT OR REPLACE INTO audio_features (track_id, {", ".join(FEATURE_COLUMNS)}, fetched_at) '
+                    f'VALUES (?, ?, ?, ?, ?, ?)',
+                    [
+                        (track_id, *(features[c] for c in FEATURE_COLUMNS), now)
+                        for track_id, features in features_by_id.items()
+                    ]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Audio feature cache write failed: {str(e)}")
+
+def normalize_text(text: str) -> str:
+    """Casefold and collapse whitespace"""
+    return ' '.join(text.casefold().split())
+
+def normalize_query(song_name: str, artist_name: str = None) -> str:
+    """Case- and whitespace-insensitive key for a (song, artist) lookup"""
+    return f"{normalize_text(song_name)}\x1f{normalize_text(artist_name or '')}"
+
+class TrackLookupStore:
+    """Persistent normalized (song, artist) -> resolved track cache, including misses"""
+
+    def __init__(self, pool, ttl: float = 7 * 24 * 3600, negative_ttl: float = 3600):
+        self.pool = pool
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    def init_schema(self):
+        """Create the cache table if it does not exist"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS track_lookups (
+                    query_key TEXT PRIMARY KEY,
+                    track TEXT,
+                    fetched_at REAL
+                )
+            ''')
+            conn.commit()
+
+    def get(self, query_key: str):
+        """Return (found, track); track is None for a cached miss"""
+        now = time.time()
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT track, fetched_at FROM track_lookups WHERE query_key = ?',
+                    (query_key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Track lookup cache read failed: {str(e)}")
+            return False, None
+        if row is None:
+            return False, None
+        track, fetched_at = row
+        if fetched_at < now - (self.ttl if track is not None else self.negative_ttl):
+            return False, None
+        return True, json.loads(track) if track is not None else None
+
+    def put(self, query_key: str, track: Optional[dict]):
+        """Store a resolved track, or None to remember that the query matched nothing"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO track_lookups (query_key, track, fetched_at) VALUES (?, ?, ?)',
+                    (query_key, json.dumps(track) if track is not None else None, time.time())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Track lookup cache write failed: {str(e)}")
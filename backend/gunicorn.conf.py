@@ -0,0 +1,30 @@
+import gc
+import os
+
+# Multi-worker serving: gunicorn manages uvicorn workers forked from one master.
+#   gunicorn -c gunicorn.conf.py app:app
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WORKERS", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+limit_concurrency = int(os.getenv("WORKER_CONNECTIONS", 100))
+timeout = int(os.getenv("TIMEOUT", 30))
+keepalive = 30
+
+# Import app.py once in the master: the model's memory maps, the scaler and the
+# imported libraries are inherited by every worker instead of being loaded per worker.
+# Per-worker resources (SQLite pool, Spotify HTTP client, Redis connections) are
+# opened lazily inside each worker after the fork.
+preload_app = True
+
+def when_ready(server):
+    # Move everything allocated while importing the app out of the collector's reach,
+    # so garbage collection in the workers does not touch (and copy) the shared pages
+    gc.freeze()
+
+def post_worker_init(worker):
+    # UvicornWorker does not map gunicorn's worker_connections, so apply the limit directly
+    worker.config.limit_concurrency = limit_concurrency
+
+def child_exit(server, worker):
+    import metrics
+    metrics.mark_worker_dead(worker.pid)
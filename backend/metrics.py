@@ -0,0 +1,101 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# With several workers each process writes its samples under this directory and
+# /metrics aggregates them, whichever worker serves the scrape
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    'spotopia_request_duration_seconds',
+    'HTTP request latency by endpoint',
+    ['method', 'endpoint', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    'spotopia_stage_duration_seconds',
+    'Latency of individual request stages',
+    ['endpoint', 'stage'],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    'spotopia_cache_lookups_total',
+    'Cache lookups by cache and result (hit, miss or error)',
+    ['cache', 'result']
+)
+CACHE_BYTES = Gauge(
+    'spotopia_cache_bytes',
+    'Bytes held by an in-process cache',
+    ['cache'],
+    multiprocess_mode='livesum'
+)
+SPOTIFY_CALLS = Counter(
+    'spotopia_spotify_calls_total',
+    'Spotify Web API calls by endpoint and outcome',
+    ['call', 'outcome']
+)
+SPOTIFY_HEDGES = Counter(
+    'spotopia_spotify_hedged_requests_total',
+    'Extra Spotify requests sent by hedging (backup for a slow call) or retrying a failed one',
+    ['call', 'kind']
+)
+CIRCUIT_STATE = Gauge(
+    'spotopia_circuit_state',
+    'Circuit breaker state: 0 closed, 1 half-open, 2 open',
+    ['circuit'],
+    multiprocess_mode='livemax'
+)
+STARTUP_SECONDS = Gauge(
+    'spotopia_startup_seconds',
+    'Seconds each component took to come up, and the whole cold start until ready',
+    ['component'],
+    multiprocess_mode='max'
+)
+FALLBACKS = Counter(
+    'spotopia_fallbacks_total',
+    'Degraded responses by fallback reason',
+    ['reason']
+)
+COALESCED = Counter(
+    'spotopia_coalesced_requests_total',
+    'Calls that joined an identical in-flight computation instead of starting one',
+    ['flight']
+)
+ANN_CANDIDATES = Histogram(
+    'spotopia_ann_candidates',
+    'Candidates returned per nearest-neighbour query',
+    ['engine'],
+    buckets=(1, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+
+@contextmanager
+def time_stage(endpoint: str, stage: str):
+    """Record how long a block takes as one request stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(endpoint, stage).observe(time.perf_counter() - start)
+
+def observe_candidates(engine: str, counts):
+    """Candidate observer hook for LightweightRecommender"""
+    histogram = ANN_CANDIDATES.labels(engine)
+    for count in counts:
+        histogram.observe(count)
+
+def render():
+    """Current metrics in Prometheus text format, with their content type"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid: int):
+    """Drop the live gauges of an exited worker process"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,62 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from recommender import LightweightRecommender
+
+logger = logging.getLogger(__name__)
+
+class _ModelHandle:
+    """A loaded recommender plus the number of requests currently using it"""
+
+    def __init__(self, recommender: LightweightRecommender):
+        self.recommender = recommender
+        self.active = 0
+        self.retired = False
+
+class ModelRegistry:
+    """Holds the serving recommender and swaps it atomically.
+
+    Requests pin the model they started with, so a swap never changes the
+    model under an in-flight request; the retired model is unloaded once its
+    last request finishes.
+    """
+
+    def __init__(self):
+        self._current = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> LightweightRecommender:
+        return self._current.recommender if self._current else None
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            handle = self._current
+            handle.active += 1
+        try:
+            yield handle.recommender
+        finally:
+            with self._lock:
+                handle.active -= 1
+                release = handle.retired and handle.active == 0
+            if release:
+                self._release(handle)
+
+    def swap(self, recommender: LightweightRecommender):
+        """Make a loaded recommender the serving one and return the previous version"""
+        with self._lock:
+            old = self._current
+            self._current = _ModelHandle(recommender)
+            if old is not None:
+                old.retired = True
+            release = old is not None and old.active == 0
+        if release:
+            self._release(old)
+        logger.info(f"Serving model version {recommender.model_version}")
+        return old.recommender.model_version if old else None
+
+    def _release(self, handle: _ModelHandle):
+        logger.info(f"Unloading retired model version {handle.recommender.model_version}")
+        handle.recommender.unload()
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING, OK, FAILED = 'pending', 'ok', 'failed'
+
+class Readiness:
+    """Startup state of the components the service depends on.
+
+    Required components gate readiness; optional ones (caches, Spotify) are
+    reported, but the service runs degraded without them. The cold start is
+    the time from `started_at` until every required component is up.
+    """
+
+    def __init__(self, started_at: float, budget: float):
+        self.started_at = started_at
+        self.budget = budget
+        self.cold_start_seconds = None
+        self.components = {}
+
+    def register(self, name: str, required: bool = True):
+        self.components[name] = {'status': PENDING, 'required': required, 'seconds': None}
+
+    @property
+    def ready(self) -> bool:
+        return all(c['status'] == OK for c in self.components.values() if c['required'])
+
+    def record(self, name: str, seconds: float, error: Optional[Exception] = None, detail: Optional[str] = None):
+        """Record the outcome of bringing a component up"""
+        component = self.components[name]
+        component.update(status=FAILED if error else OK, seconds=round(seconds, 3))
+        component.pop('error', None)
+        component.pop('detail', None)
+        if error:
+            component['error'] = str(error)
+        elif detail:
+            component['detail'] = detail
+        metrics.STARTUP_SECONDS.labels(name).set(seconds)
+        if self.cold_start_seconds is None and self.ready:
+            self.cold_start_seconds = time.monotonic() - self.started_at
+            metrics.STARTUP_SECONDS.labels('cold_start').set(self.cold_start_seconds)
+            if self.cold_start_seconds > self.budget:
+                logger.warning(f"Cold start took {self.cold_start_seconds:.2f}s, over the {self.budget:.0f}s budget")
+            else:
+                logger.info(f"Ready after a {self.cold_start_seconds:.2f}s cold start")
+
+    async def run(self, name: str, step: Callable[[], Awaitable[Optional[str]]],
+                  retry_delay: float = 1.0, max_retry_delay: float = 30.0) -> bool:
+        """Bring a component up; required components are retried with backoff until they succeed"""
+        required = self.components[name]['required']
+        while True:
+            start = time.monotonic()
+            try:
+                detail = await step()
+            except Exception as e:
+                self.record(name, time.monotonic() - start, error=e)
+                if not required:
+                    logger.warning(f"{name} unavailable at startup, continuing without it: {str(e)}")
+                    return False
+                logger.error(f"Failed to start {name}, retrying in {retry_delay:.0f}s: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, max_retry_delay)
+                continue
+            self.record(name, time.monotonic() - start, detail=detail)
+            return True
+
+    def report(self) -> dict:
+        return {
+            'ready': self.ready,
+            'cold_start_seconds': round(self.cold_start_seconds, 3) if self.cold_start_seconds is not None else None,
+            'cold_start_budget_seconds': self.budget,
+            'components': self.components
+        }
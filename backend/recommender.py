@@ -1,19 +1,142 @@
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from annoy import AnnoyIndex
 import pickle
 from typing import List, Dict, Union
 import joblib
 import os
+import hashlib
+import json
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.preprocessing import StandardScaler
 import gc
+import sys
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+ENGINES = ('annoy', 'exact')
+
+# Serving copy of the song catalog written next to the index: only the columns the
+# API needs, with downcast numbers and dictionary-encoded artist strings
+CATALOG_FILE = 'catalog.parquet'
+CATALOG_COLUMNS = ['name', 'artists', 'year', 'popularity']
+CATALOG_SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('name', pa.string()),
+    ('artists', pa.dictionary(pa.int32(), pa.string())),
+    ('year', pa.int16()),
+    ('popularity', pa.float32()),
+])
+
+# Precomputed top-K recommendations per catalog song, so catalog seeds skip feature lookup and search
+NEIGHBOURS_FILE = 'neighbours_light.npy'
+
+def catalog_table(chunk: pd.DataFrame, first_id: int) -> pa.Table:
+    """Convert a chunk of catalog rows into the compact catalog schema"""
+    artists = chunk['artists']
+    if len(artists) and not isinstance(artists.iloc[0], str):
+        # Partitioned Parquet from data_analysis.py stores artists as lists
+        artists = artists.map(lambda names: str(list(names)))
+    return pa.table({
+        'id': pa.array(np.arange(first_id, first_id + len(chunk), dtype=np.int32)),
+        'name': pa.array(chunk['name'].fillna('').astype(str), type=pa.string()),
+        'artists': pa.array(artists.astype(str), type=pa.string()).dictionary_encode(),
+        'year': pa.array(chunk['year'].to_numpy(dtype=np.int16)),
+        'popularity': pa.array(chunk['popularity'].to_numpy(dtype=np.float32)),
+    }, schema=CATALOG_SCHEMA)
+
+# Rerank scorers map a batch of candidates (a dict of aligned arrays) to scores in (0, 1].
+# Scores are combined as a weighted product, so weight 0 disables a scorer and 1 applies it fully.
+def similarity_score(batch: dict) -> np.ndarray:
+    """Closeness in the index: 1 / (1 + angular distance)"""
+    return 1 / (1 + batch['distances'])
+
+def temporal_score(batch: dict) -> np.ndarray:
+    """Exponential decay with the year gap to the seed; neutral without a seed year"""
+    if batch['year'] is None:
+        return np.ones(len(batch['ids']))
+    return np.exp(-np.abs(batch['year'] - batch['years'].astype(np.float64)) / 10)
+
+def popularity_score(batch: dict) -> np.ndarray:
+    """Popularity (0-100) mapped into (0, 1]; neutral for models built without popularity"""
+    if batch['popularity'] is None:
+        return np.ones(len(batch['ids']))
+    return (np.clip(batch['popularity'].astype(np.float64), 0, 100) + 1) / 101
+
+SCORERS = {
+    'similarity': similarity_score,
+    'temporal': temporal_score,
+    'popularity': popularity_score,
+}
+DEFAULT_RERANK_WEIGHTS = {'similarity': 1.0, 'temporal': 1.0, 'popularity': 0.0}
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, where the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def resolve_model_dir(models_root: str, version: str = None) -> str:
+    """Find a model directory: an explicit version, the one named in CURRENT, or a flat legacy layout"""
+    if version:
+        return os.path.join(models_root, version)
+    current_path = os.path.join(models_root, 'CURRENT')
+    if os.path.exists(current_path):
+        with open(current_path) as f:
+            return os.path.join(models_root, f.read().strip())
+    return models_root
+
+def publish_model(models_root: str, version: str):
+    """Atomically point CURRENT at a versioned model directory"""
+    tmp_path = os.path.join(models_root, 'CURRENT.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(models_root, 'CURRENT'))
+
+def parse_rerank_weights(spec: str) -> Dict[str, float]:
+    """Parse rerank weights given as "scorer=weight,..." (similarity, temporal, popularity)"""
+    return {
+        name.strip(): float(weight)
+        for name, weight in (item.split('=') for item in spec.split(',') if item.strip())
+    }
 
 class LightweightRecommender:
-    def __init__(self):
+    def __init__(self, engine: str = 'annoy'):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        self.engine = engine
+        self.exact_chunk_elements = 4 * 1024 * 1024  # Bound per-chunk similarity matrix to ~16MB
+        self.candidate_observer = None  # Optional callable(engine, candidate counts) for metrics
+        self._feature_norms = None
         self.content_index = None
-        self.metadata = None
+        self.era_indexes = {}
+        self.era_ids = None
+        self.era_bounds = {}
+        self.era_min_weight = 0.05  # Skip eras whose temporal weight falls below this
+        self.features = None
+        self.years = None
+        self.popularity = None
         self.scaler = None
+        self.scorers = dict(SCORERS)
+        self.rerank_weights = dict(DEFAULT_RERANK_WEIGHTS)
+        self.candidate_multiplier = 5  # ANN candidates returned per recommendation, then reranked
+        self.neighbour_k = 20  # Recommendations precomputed per catalog song at build time, covering typical limits
+        self.neighbours = None
+        self.neighbour_config = None  # k and ranking settings the table was built with
         self._song_data = None
+        self.model_version = None
+        self.model_dir = None
+        self.manifest = None
         self.feature_weights = {
             'acousticness': 1.2,
             'liveness': 0.8,
@@ -21,90 +144,418 @@ class LightweightRecommender:
             'tempo': 1.0
         }
         self.base_features = list(self.feature_weights.keys())
+        self.tempo_range = (50, 200)
+        self.delta_log_offset = 0  # Bytes of the shared delta log already applied
+        self._delta_lock = threading.Lock()
+        self._reset_delta()
         
+    def _reset_delta(self):
+        """Empty the buffer of songs added since the index was built"""
+        # Scaled features, years, unit vectors and popularity are swapped in as one tuple
+        # so readers always see a consistent set
+        empty = np.empty((0, len(self.base_features)), dtype=np.float32)
+        self._delta = (empty, np.empty(0, dtype=np.int16), empty, np.empty(0, dtype=np.float32))
+        self.delta_songs = []
+        self.delta_log_offset = 0
+
+    @property
+    def delta_size(self) -> int:
+        """Songs in the delta buffer, not yet part of the Annoy index"""
+        return len(self._delta[1])
+
+    @property
+    def n_songs(self) -> int:
+        """Indexed songs plus buffered ones; the id the next added song gets"""
+        return len(self.years) + self.delta_size
+
+    def set_rerank_weights(self, weights: Dict[str, float]):
+        """Override the weights of registered scorers"""
+        unknown = [name for name in weights if name not in self.scorers]
+        if unknown:
+            raise ValueError(f"Unknown rerank scorers {unknown}, expected some of {list(self.scorers)}")
+        self.rerank_weights.update({name: float(weight) for name, weight in weights.items()})
+
+    @property
+    def lineage(self) -> str:
+        """Version of the source build this model descends from; compacted models keep their parent's"""
+        if self.manifest:
+            return self.manifest.get('lineage', self.manifest['version'])
+        return self.model_version
+
+    @property
+    def catalog_path(self) -> str:
+        """The model's compact catalog, or cleaned_data.csv for models built without one"""
+        if self.model_dir and os.path.exists(f'{self.model_dir}/{CATALOG_FILE}'):
+            return f'{self.model_dir}/{CATALOG_FILE}'
+        return 'cleaned_data.csv'
+
     @property
     def song_data(self):
         """Lazy load song data only when needed"""
         if self._song_data is None:
-            self._song_data = pd.read_csv('cleaned_data.csv')
+            path = self.catalog_path
+            if path.endswith('.parquet'):
+                self._song_data = pd.read_parquet(path).set_index('id')
+            else:
+                self._song_data = pd.read_csv(path, usecols=CATALOG_COLUMNS)
         return self._song_data
 
-    def build_model(self, data_path: str, model_path: str, n_trees: int = 50):
-        """Build and save the model files with memory optimization"""
-        print("Loading data in chunks...")
-        chunk_size = 1000  # Process data in smaller chunks
-        chunks = pd.read_csv(data_path, chunksize=chunk_size)
-        
-        all_features = []
-        for chunk in chunks:
-            # Extract and weight features
-            feature_matrix = chunk[self.base_features].values
-            weighted_features = np.zeros_like(feature_matrix)
-            
-            for i, feature in enumerate(self.base_features):
-                weighted_features[:, i] = feature_matrix[:, i] * self.feature_weights[feature]
-            
-            all_features.append(weighted_features)
-            
-        # Combine features and scale
-        feature_matrix = np.vstack(all_features)
+    def iter_catalog(self, data_path: str = None, chunk_size: int = 50000):
+        """Stream only the serving columns of the song catalog, indexed by song id"""
+        data_path = data_path or self.catalog_path
+        if data_path.endswith('.parquet'):
+            return (
+                batch.to_pandas().set_index('id')
+                for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_size)
+            )
+        return pd.read_csv(data_path, usecols=CATALOG_COLUMNS, chunksize=chunk_size)
+
+    def _iter_feature_chunks(self, data_path: str, chunk_size: int, columns: List[str] = None):
+        """Stream only the needed columns, with explicit dtypes, from CSV, Parquet or a partitioned Parquet directory"""
+        columns = columns or self.base_features + ['year']
+        if os.path.isdir(data_path):
+            dataset = ds.dataset(data_path, format='parquet', partitioning='hive')
+            for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif data_path.endswith('.parquet'):
+            for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            dtypes = {feature: np.float32 for feature in self.base_features}
+            dtypes['year'] = np.int16
+            yield from pd.read_csv(data_path, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+
+    def build_model(self, data_path: str, model_path: str, n_trees: int = 50, chunk_size: int = 100000) -> dict:
+        """Build and save the model files in a single streaming pass over the data"""
+        timings = {}
+        stage_start = time.perf_counter()
+        
+        # Single pass: weight each chunk, update the scaler and append into preallocated arrays
+        print("Streaming data...")
+        weights = np.array([self.feature_weights[feature] for feature in self.base_features], dtype=np.float32)
         self.scaler = StandardScaler()
-        scaled_features = self.scaler.fit_transform(feature_matrix)
+        capacity = chunk_size
+        features = np.empty((capacity, len(self.base_features)), dtype=np.float32)
+        years = np.empty(capacity, dtype=np.int16)
+        popularity = np.empty(capacity, dtype=np.float32)
+        n_rows = 0
+        
+        # The serving catalog is written in the same pass, so song ids always match index items
+        os.makedirs(model_path, exist_ok=True)
+        columns = list(dict.fromkeys(self.base_features + CATALOG_COLUMNS))
+        catalog_writer = pq.ParquetWriter(f'{model_path}/{CATALOG_FILE}', CATALOG_SCHEMA, compression='zstd')
+        for chunk in self._iter_feature_chunks(data_path, chunk_size, columns):
+            catalog_writer.write_table(catalog_table(chunk, n_rows))
+            weighted = chunk[self.base_features].to_numpy(dtype=np.float32) * weights
+            self.scaler.partial_fit(weighted)
+            end = n_rows + len(weighted)
+            if end > capacity:
+                capacity = max(end, capacity * 2)
+                features = np.resize(features, (capacity, len(self.base_features)))
+                years = np.resize(years, capacity)
+                popularity = np.resize(popularity, capacity)
+            features[n_rows:end] = weighted
+            years[n_rows:end] = chunk['year'].to_numpy(dtype=np.int16)
+            popularity[n_rows:end] = chunk['popularity'].to_numpy(dtype=np.float32)
+            n_rows = end
+        catalog_writer.close()
+        timings['read_and_fit'] = time.perf_counter() - stage_start
+        
+        # Scale in place with the fitted statistics
+        stage_start = time.perf_counter()
+        self.features = features[:n_rows]
+        self.years = years[:n_rows].copy()
+        self.popularity = popularity[:n_rows].copy()
+        self.features -= self.scaler.mean_.astype(np.float32)
+        self.features /= self.scaler.scale_.astype(np.float32)
+        timings['scale'] = time.perf_counter() - stage_start
+        return self._build_and_save(model_path, n_trees, timings)
+
+    def _build_and_save(self, model_path: str, n_trees: int, timings: dict, lineage: str = None) -> dict:
+        """Index the scaled features and write every model file except the catalog"""
+        n_rows = len(self.years)
         
         # Build optimized Annoy index
-        print("Building Annoy index...")
+        print(f"Building Annoy index over {n_rows:,} songs...")
+        stage_start = time.perf_counter()
         self.content_index = AnnoyIndex(len(self.base_features), 'angular')
-        
-        for i in range(len(scaled_features)):
-            self.content_index.add_item(i, scaled_features[i])
+        for i, vector in enumerate(self.features.tolist()):
+            self.content_index.add_item(i, vector)
         
         # Build with more trees for better accuracy but controlled memory
         self.content_index.build(n_trees, n_jobs=-1)  # Use all CPUs for building
-        
-        # Create metadata with minimal memory footprint
-        print("Creating metadata...")
-        chunks = pd.read_csv(data_path, chunksize=chunk_size)
-        self.metadata = {}
-        
-        for chunk_idx, chunk in enumerate(chunks):
-            start_idx = chunk_idx * chunk_size
-            for i in range(len(chunk)):
-                idx = start_idx + i
-                self.metadata[idx] = {
-                    'features': scaled_features[idx],
-                    'year': int(chunk.iloc[i]['year'])
-                }
+        timings['annoy_build'] = time.perf_counter() - stage_start
         
         # Save model files
-        os.makedirs(model_path, exist_ok=True)
+        stage_start = time.perf_counter()
         print("Saving model files...")
         self.content_index.save(f'{model_path}/content_light.ann')
         
-        # Save metadata in chunks to reduce memory usage
-        metadata_path = f'{model_path}/metadata_light.pkl'
-        with open(metadata_path, 'wb') as f:
-            pickle.dump(self.metadata, f, protocol=4)
+        # Plain .npy arrays can be memory-mapped at load time
+        np.save(f'{model_path}/features_light.npy', self.features)
+        np.save(f'{model_path}/years_light.npy', self.years)
+        if self.popularity is not None:
+            np.save(f'{model_path}/popularity_light.npy', self.popularity)
         
         joblib.dump(self.scaler, f'{model_path}/scaler.pkl')
+        timings['save'] = time.perf_counter() - stage_start
+        
+        print("Building era indexes...")
+        stage_start = time.perf_counter()
+        self._build_era_indexes(model_path, n_trees)
+        timings['era_indexes'] = time.perf_counter() - stage_start
+        
+        print(f"Precomputing {self.neighbour_k} neighbours per song...")
+        stage_start = time.perf_counter()
+        self._build_neighbour_table(model_path)
+        timings['neighbours'] = time.perf_counter() - stage_start
+        
+        build_stats = {
+            'timings_s': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        self.manifest = self._write_manifest(model_path, n_trees, build_stats, lineage)
+        self.model_version = self.manifest['version']
         
         # Clear memory
         gc.collect()
+        for stage, seconds in timings.items():
+            print(f"  {stage}: {seconds:.2f}s")
+        if build_stats['peak_rss_mb'] is not None:
+            print(f"  peak memory: {build_stats['peak_rss_mb']:.1f} MB")
         print("Model files saved successfully!")
+        return build_stats
+
+    def _write_manifest(self, model_path: str, n_trees: int, build_stats: dict = None, lineage: str = None) -> dict:
+        """Describe a build so it can be versioned, verified and hot-swapped"""
+        built_at = time.time()
+        version = os.path.basename(os.path.normpath(model_path))
+        manifest = {
+            'version': version,
+            'lineage': lineage or version,
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(built_at)),
+            'row_count': int(len(self.years)),
+            'feature_weights': self.feature_weights,
+            'tempo_range': list(self.tempo_range),
+            'scaler': 'scaler.pkl',
+            'catalog': CATALOG_FILE,
+            'n_trees': n_trees,
+            'eras': sorted(self.era_bounds),
+            'neighbours': self.neighbour_config,
+            'build_stats': build_stats,
+        }
+        with open(f'{model_path}/manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def compact(self, model_path: str, n_trees: int = None) -> dict:
+        """Build a new model from the indexed songs plus the delta buffer, without re-reading source data.
+
+        The serving model is left untouched; the new one keeps its scaler and lineage,
+        so song ids and the shared delta log stay valid across the swap.
+        """
+        with self._delta_lock:
+            delta_features, delta_years, _, delta_popularity = self._delta
+            delta_songs = self.delta_songs[:len(delta_years)]
+        timings = {}
+        stage_start = time.perf_counter()
+        
+        builder = LightweightRecommender(engine=self.engine)
+        builder.feature_weights = dict(self.feature_weights)
+        builder.base_features = list(self.base_features)
+        builder.tempo_range = self.tempo_range
+        builder.scaler = self.scaler
+        # Precompute neighbours the way this model ranks them
+        builder.rerank_weights = dict(self.rerank_weights)
+        builder.candidate_multiplier = self.candidate_multiplier
+        builder.neighbour_k = self.neighbour_k
+        builder.features = np.concatenate([self.features, delta_features])
+        builder.years = np.concatenate([self.years, delta_years])
+        if self.popularity is not None:
+            builder.popularity = np.concatenate([self.popularity, delta_popularity])
+        
+        # Carry the catalog over and append the buffered songs under the ids they were served with
+        print(f"Compacting {len(delta_years):,} buffered songs into {model_path}...")
+        os.makedirs(model_path, exist_ok=True)
+        with pq.ParquetWriter(f'{model_path}/{CATALOG_FILE}', CATALOG_SCHEMA, compression='zstd') as writer:
+            n_rows = 0
+            for chunk in self.iter_catalog():
+                writer.write_table(catalog_table(chunk, n_rows))
+                n_rows += len(chunk)
+            if delta_songs:
+                writer.write_table(catalog_table(pd.DataFrame(delta_songs), n_rows))
+        timings['catalog'] = time.perf_counter() - stage_start
+        
+        n_trees = n_trees or (self.manifest or {}).get('n_trees', 50)
+        build_stats = builder._build_and_save(model_path, n_trees, timings, lineage=self.lineage)
+        builder.unload()
+        return build_stats
 
     def load_model(self, model_path: str):
         """Load model files with memory optimization"""
+        # Versioned models carry the weights they were built with
+        manifest_path = f'{model_path}/manifest.json'
+        self.model_dir = model_path
+        self.manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            self.feature_weights = dict(self.manifest['feature_weights'])
+            self.base_features = list(self.feature_weights.keys())
+            self.tempo_range = tuple(self.manifest.get('tempo_range', self.tempo_range))
+        
         self.content_index = AnnoyIndex(len(self.base_features), 'angular')
         self.content_index.load(f'{model_path}/content_light.ann')
         
-        # Load metadata
-        with open(f'{model_path}/metadata_light.pkl', 'rb') as f:
-            self.metadata = pickle.load(f)
+        # Memory-map columnar metadata so it lives in the page cache, not the heap
+        features_path = f'{model_path}/features_light.npy'
+        if os.path.exists(features_path):
+            self.features = np.load(features_path, mmap_mode='r')
+            self.years = np.load(f'{model_path}/years_light.npy', mmap_mode='r')
+        else:
+            self._load_legacy_metadata(f'{model_path}/metadata_light.pkl')
+        # Older models have no popularity column; the popularity scorer is neutral for them
+        popularity_path = f'{model_path}/popularity_light.npy'
+        self.popularity = np.load(popularity_path, mmap_mode='r') if os.path.exists(popularity_path) else None
             
-        self.scaler = joblib.load(f'{model_path}/scaler.pkl')
+        self.scaler = joblib.load(f'{model_path}/{self.manifest["scaler"] if self.manifest else "scaler.pkl"}')
+        self._load_era_indexes(model_path)
+        self.neighbour_config = self.manifest.get('neighbours') if self.manifest else None
+        self.neighbours = np.load(f'{model_path}/{NEIGHBOURS_FILE}', mmap_mode='r') if self.neighbour_config else None
+        if self.neighbour_config:
+            # Compactions rebuild the table at the size it was built with
+            self.neighbour_k = self.neighbour_config['k']
+        if self.manifest and self.manifest['row_count'] != len(self.years):
+            raise ValueError(
+                f"Model {model_path} has {len(self.years)} rows but its manifest expects {self.manifest['row_count']}"
+            )
+        catalog_path = f'{model_path}/{CATALOG_FILE}'
+        if os.path.exists(catalog_path):
+            catalog_rows = pq.ParquetFile(catalog_path).metadata.num_rows
+            if catalog_rows != len(self.years):
+                raise ValueError(f"Model {model_path} has {len(self.years)} rows but its catalog has {catalog_rows}")
+        self.model_version = self.manifest['version'] if self.manifest else self._fingerprint(model_path)
+        self._feature_norms = None
+        self._song_data = None
+        self._reset_delta()
+
+    def unload(self):
+        """Release the mmap'd indexes and arrays; only call once no request uses this model"""
+        if self.content_index is not None:
+            self.content_index.unload()
+        for index in self.era_indexes.values():
+            index.unload()
+        self.content_index = None
+        self.era_indexes = {}
+        self.era_ids = None
+        self.features = None
+        self.years = None
+        self.popularity = None
+        self.neighbours = None
+        self._feature_norms = None
+        gc.collect()
+
+    def _build_era_indexes(self, model_path: str, n_trees: int):
+        """Build one Annoy index per decade; local item i of an era maps to era_ids[start + i]"""
+        eras = (self.years.astype(np.int32) // 10) * 10
+        self.era_ids = np.argsort(eras, kind='stable').astype(np.int32)
+        sorted_eras = eras[self.era_ids]
+        self.era_bounds = {}
+        self.era_indexes = {}
+        
+        for era in np.unique(sorted_eras):
+            start, stop = np.searchsorted(sorted_eras, [era, era + 1])
+            index = AnnoyIndex(len(self.base_features), 'angular')
+            for local_id, vector in enumerate(self.features[self.era_ids[start:stop]].tolist()):
+                index.add_item(local_id, vector)
+            index.build(n_trees, n_jobs=-1)
+            index.save(f'{model_path}/content_light_{era}s.ann')
+            self.era_indexes[int(era)] = index
+            self.era_bounds[int(era)] = (int(start), int(stop))
+        
+        np.save(f'{model_path}/era_ids_light.npy', self.era_ids)
+        with open(f'{model_path}/eras_light.json', 'w') as f:
+            json.dump({str(era): bounds for era, bounds in self.era_bounds.items()}, f)
+
+    def _load_era_indexes(self, model_path: str):
+        """Load per-era indexes if the model has them; older models only use the global index"""
+        self.era_indexes = {}
+        self.era_bounds = {}
+        self.era_ids = None
+        eras_path = f'{model_path}/eras_light.json'
+        if not os.path.exists(eras_path):
+            return
+        with open(eras_path) as f:
+            self.era_bounds = {int(era): tuple(bounds) for era, bounds in json.load(f).items()}
+        self.era_ids = np.load(f'{model_path}/era_ids_light.npy', mmap_mode='r')
+        for era in self.era_bounds:
+            index = AnnoyIndex(len(self.base_features), 'angular')
+            index.load(f'{model_path}/content_light_{era}s.ann')
+            self.era_indexes[era] = index
+
+    def _build_neighbour_table(self, model_path: str, chunk_size: int = 20000):
+        """Rank the top neighbour_k recommendations for every song, seeded by its own features and year"""
+        n_rows = len(self.years)
+        table = np.full((n_rows, self.neighbour_k), -1, dtype=np.int32)
+        for start in range(0, n_rows, chunk_size):
+            stop = min(start + chunk_size, n_rows)
+            queries = self._scale_queries(self._raw_features(self.features[start:stop]))
+            # A song is its own nearest match, so rank one more and drop it
+            ranked = self._recommend_scaled(queries, self.years[start:stop].tolist(), self.neighbour_k + 1, with_similarities=False)
+            for row, ids in enumerate(ranked, start):
+                ids = [idx for idx in ids if idx != row][:self.neighbour_k]
+                table[row, :len(ids)] = ids
+        np.save(f'{model_path}/{NEIGHBOURS_FILE}', table)
+        self.neighbours = table
+        self.neighbour_config = {
+            'file': NEIGHBOURS_FILE,
+            'k': self.neighbour_k,
+            'engine': self.engine,
+            'rerank_weights': dict(self.rerank_weights),
+            'candidate_multiplier': self.candidate_multiplier
+        }
+
+    def plan_era_probes(self, year: int, n_candidates: int) -> Dict[int, int]:
+        """Split a candidate budget over the seed's era and its neighbours by temporal weight"""
+        seed_era = (year // 10) * 10
+        weights = {
+            era: self.calculate_temporal_similarity(seed_era, era)
+            for era in self.era_bounds
+        }
+        weights = {era: w for era, w in weights.items() if w >= self.era_min_weight}
+        total_weight = sum(weights.values())
+        plan = {}
+        for era, weight in weights.items():
+            start, stop = self.era_bounds[era]
+            plan[era] = min(stop - start, max(1, math.ceil(n_candidates * weight / total_weight)))
+        return plan
+
+    def _fingerprint(self, model_path: str) -> str:
+        """Identify a model build from its scaler, index size and per-song years"""
+        digest = hashlib.md5()
+        with open(f'{model_path}/scaler.pkl', 'rb') as f:
+            digest.update(f.read())
+        digest.update(str(os.path.getsize(f'{model_path}/content_light.ann')).encode())
+        digest.update(np.ascontiguousarray(self.years).tobytes())
+        return digest.hexdigest()[:16]
+
+    def _load_legacy_metadata(self, metadata_path: str):
+        """Convert a per-row pickled metadata dict into columnar arrays"""
+        with open(metadata_path, 'rb') as f:
+            metadata = pickle.load(f)
+        
+        n_songs = max(metadata) + 1 if metadata else 0
+        self.features = np.zeros((n_songs, len(self.base_features)), dtype=np.float32)
+        self.years = np.zeros(n_songs, dtype=np.int16)
+        for idx, meta in metadata.items():
+            self.features[idx] = meta['features']
+            self.years[idx] = meta['year']
+        del metadata
+        gc.collect()
 
     def normalize_tempo(self, tempo: float) -> float:
         """Normalize tempo to a 0-1 range"""
-        min_tempo, max_tempo = 50, 200
+        min_tempo, max_tempo = self.tempo_range
         normalized = (tempo - min_tempo) / (max_tempo - min_tempo)
         return max(0, min(1, normalized))
 
@@ -113,65 +564,381 @@ class LightweightRecommender:
         year_diff = abs(year1 - year2)
         return np.exp(-year_diff / 10)  # Exponential decay with 10-year half-life
 
-    def recommend_from_features(self, features: Dict[str, float], year: int = None, n_recommendations: int = 10) -> Dict[str, List]:
-        """Get recommendations with memory-efficient processing"""
-        # Normalize and weight features
-        features['tempo'] = self.normalize_tempo(features['tempo'])
-        weighted_features = np.array([
-            features[feature] * self.feature_weights[feature]
-            for feature in self.base_features
-        ]).reshape(1, -1)
-        
-        # Scale features
-        scaled_features = self.scaler.transform(weighted_features)
-        
-        # Get candidates with search_k optimization
-        search_k = min(n_recommendations * 50, 10000)  # Optimize search depth
-        candidates, distances = self.content_index.get_nns_by_vector(
-            scaled_features.flatten(),
-            n_recommendations * 2,  # Get extra candidates for filtering
-            include_distances=True,
-            search_k=search_k
-        )
+    def _prepare_queries(self, features_list: List[Dict[str, float]]) -> np.ndarray:
+        """Normalize, weight and scale a batch of feature dicts in one pass"""
+        raw = np.array([
+            [features[feature] for feature in self.base_features]
+            for features in features_list
+        ], dtype=np.float64).reshape(-1, len(self.base_features))
+        return self._scale_queries(raw)
+
+    def _scale_queries(self, raw: np.ndarray) -> np.ndarray:
+        """Normalize tempo, weight and scale a matrix of raw feature rows as queries"""
+        raw = np.array(raw, dtype=np.float64)
         
-        # Process recommendations
-        recommendations = []
-        feature_similarities = []
+        # Normalize tempo for the whole column at once
+        min_tempo, max_tempo = self.tempo_range
+        tempo_col = self.base_features.index('tempo')
+        raw[:, tempo_col] = np.clip((raw[:, tempo_col] - min_tempo) / (max_tempo - min_tempo), 0, 1)
         
-        for idx, distance in zip(candidates, distances):
-            if idx not in self.metadata:
-                continue
-                
-            meta = self.metadata[idx]
-            similarity_score = 1 / (1 + distance)  # Convert distance to similarity
-            
-            # Apply temporal similarity if year is provided
-            if year is not None:
-                temporal_weight = self.calculate_temporal_similarity(year, meta['year'])
-                similarity_score *= temporal_weight
-            
-            recommendations.append((idx, similarity_score))
-            
-            # Calculate feature similarities
-            similarities = {}
-            for i, feature in enumerate(self.base_features):
-                feature_sim = 1 - abs(scaled_features[0, i] - meta['features'][i])
-                similarities[feature] = float(feature_sim)
-            
-            feature_similarities.append(similarities)
-            
-            if len(recommendations) >= n_recommendations:
-                break
+        # The fitted statistics applied directly: StandardScaler.transform, without its per-call validation
+        weights = np.array([self.feature_weights[feature] for feature in self.base_features])
+        return (raw * weights - self.scaler.mean_) / self.scaler.scale_
+
+    def _raw_features(self, scaled_items: np.ndarray) -> np.ndarray:
+        """Recover raw feature rows from weighted, scaled index items"""
+        weights = np.array([self.feature_weights[feature] for feature in self.base_features])
+        return (np.asarray(scaled_items, dtype=np.float64) * self.scaler.scale_ + self.scaler.mean_) / weights
+
+    def song_features(self, song_id: int) -> Dict[str, float]:
+        """Raw audio features of a catalog song, as a Spotify audio-features lookup would return them"""
+        features, _, _ = self._gather(np.array([song_id]))
+        return {feature: round(float(value), 4) for feature, value in zip(self.base_features, self._raw_features(features)[0])}
+
+    def _scale_items(self, features_list: List[Dict[str, float]]) -> np.ndarray:
+        """Weight and scale song features exactly as build_model does for index items"""
+        raw = np.array([
+            [features[feature] for feature in self.base_features]
+            for features in features_list
+        ], dtype=np.float32).reshape(-1, len(self.base_features))
+        weights = np.array([self.feature_weights[feature] for feature in self.base_features], dtype=np.float32)
+        return self.scaler.transform(raw * weights).astype(np.float32)
+
+    def add_songs(self, songs: List[dict]) -> List[int]:
+        """Append songs to the delta buffer so they are recommendable without a rebuild.
+
+        Each song has an 'id', 'features', 'year' and catalog fields. Ids must continue
+        the catalog; ones the model already covers are skipped, so replaying is idempotent.
+        """
+        with self._delta_lock:
+            features, years, units, popularity = self._delta
+            next_id = len(self.years) + len(years)
+            new_songs = [song for song in songs if song['id'] >= next_id]
+            for offset, song in enumerate(new_songs):
+                if song['id'] != next_id + offset:
+                    raise ValueError(f"Song id {song['id']} does not continue the catalog at {next_id + offset}")
+            if not new_songs:
+                return []
+            scaled = self._scale_items([song['features'] for song in new_songs])
+            new_years = np.array([song['year'] for song in new_songs], dtype=np.int16)
+            new_popularity = np.array([song.get('popularity') or 0.0 for song in new_songs], dtype=np.float32)
+            norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.delta_songs.extend(new_songs)
+            self._delta = (
+                np.concatenate([features, scaled]),
+                np.concatenate([years, new_years]),
+                np.concatenate([units, scaled / norms]),
+                np.concatenate([popularity, new_popularity])
+            )
+        return [song['id'] for song in new_songs]
+
+    def _delta_search(self, scaled_queries: np.ndarray, n_candidates: int, years: List[int]) -> List[tuple]:
+        """Exact angular search over the delta buffer, skipping eras a year-aware query would not probe"""
+        _, delta_years, units, _ = self._delta
+        offset = len(self.years)
+        queries = np.asarray(scaled_queries, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        query_norms[query_norms == 0] = 1.0
+        sims = units @ (queries / query_norms).T  # (delta songs, n_queries)
         
-        # Sort by similarity score
-        recommendations.sort(key=lambda x: x[1], reverse=True)
-        recommendations = recommendations[:n_recommendations]
+        if self.era_bounds:
+            delta_eras = (delta_years.astype(np.int32) // 10) * 10
+            for q, year in enumerate(years):
+                if year is not None:
+                    era_weights = np.exp(-np.abs((year // 10) * 10 - delta_eras) / 10)
+                    sims[era_weights < self.era_min_weight, q] = -np.inf
+        
+        k = min(n_candidates, len(units))
+        hits = []
+        for q in range(len(queries)):
+            top = np.argpartition(-sims[:, q], k - 1)[:k] if k < len(units) else np.arange(len(units))
+            top = top[np.argsort(-sims[top, q], kind='stable')]
+            top = top[np.isfinite(sims[top, q])]
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * sims[top, q], 0.0))
+            hits.append(((top + offset).tolist(), distances.tolist()))
+        return hits
+
+    def _gather(self, ids: np.ndarray) -> tuple:
+        """Scaled features, years and popularity of song ids, from the index arrays or the delta buffer"""
+        delta_features, delta_years, _, delta_popularity = self._delta
+        n_indexed = len(self.years)
+        in_index = ids < n_indexed
+        if in_index.all():
+            popularity = self.popularity[ids] if self.popularity is not None else None
+            return self.features[ids], self.years[ids], popularity
         
+        main_ids, delta_ids = ids[in_index], ids[~in_index] - n_indexed
+        features = np.empty((len(ids), len(self.base_features)), dtype=np.float32)
+        features[in_index], features[~in_index] = self.features[main_ids], delta_features[delta_ids]
+        years = np.empty(len(ids), dtype=np.int16)
+        years[in_index], years[~in_index] = self.years[main_ids], delta_years[delta_ids]
+        popularity = None
+        if self.popularity is not None:
+            popularity = np.empty(len(ids), dtype=np.float32)
+            popularity[in_index], popularity[~in_index] = self.popularity[main_ids], delta_popularity[delta_ids]
+        return features, years, popularity
+
+    def _rank(self, query: np.ndarray, candidates: List[int], distances: List[float],
+              year: int = None, n_recommendations: int = 10) -> tuple:
+        """Rerank ANN candidates for a single scaled query with the weighted scorers; returns the top ids and their features"""
+        ids = np.asarray(candidates, dtype=np.int64)
+        distances = np.asarray(distances, dtype=np.float64)
+        valid = ids < self.n_songs
+        ids, distances = ids[valid], distances[valid]
+        if len(ids) == 0:
+            return ids, np.empty((0, len(self.base_features)), dtype=np.float32)
+        
+        features, years, popularity = self._gather(ids)
+        batch = {
+            'ids': ids, 'distances': distances, 'features': features, 'years': years,
+            'popularity': popularity, 'query': query, 'year': year
+        }
+        scores = np.ones(len(ids))
+        for name, weight in self.rerank_weights.items():
+            if weight:
+                scores *= self.scorers[name](batch) ** weight
+        
+        # Stable sort keeps the ANN order among equal scores; ids and similarities share one order
+        order = np.argsort(-scores, kind='stable')[:n_recommendations]
+        return ids[order], features[order]
+
+    def _result(self, query: np.ndarray, ids: np.ndarray, features: np.ndarray) -> Dict[str, List]:
+        similarities = 1 - np.abs(query - features)
         return {
-            'song_indices': [idx for idx, _ in recommendations],
-            'feature_similarities': feature_similarities[:n_recommendations]
+            'song_indices': ids.tolist(),
+            'feature_similarities': [dict(zip(self.base_features, row)) for row in similarities.tolist()]
         }
 
+    def _rank_candidates(self, query: np.ndarray, candidates: List[int], distances: List[float],
+                         year: int = None, n_recommendations: int = 10) -> Dict[str, List]:
+        """Rerank ANN candidates for a single scaled query, as array operations"""
+        return self._result(query, *self._rank(query, candidates, distances, year, n_recommendations))
+
+    def search_candidates(self, scaled_queries: np.ndarray, n_candidates: int, search_k: int = None,
+                          engine: str = None, max_workers: int = None, years: List[int] = None) -> List[tuple]:
+        """Find (candidate ids, angular distances) per scaled query with the selected engine.
+
+        Queries with a year probe the era indexes around it instead of the global index.
+        Songs in the delta buffer are searched exactly and merged in by distance.
+        """
+        if years is None:
+            years = [None] * len(scaled_queries)
+        hits = self._search_index(scaled_queries, n_candidates, search_k, engine, max_workers, years)
+        if self.delta_size == 0:
+            return hits
+        
+        merged = []
+        for (ids, dists), (delta_ids, delta_dists) in zip(hits, self._delta_search(scaled_queries, n_candidates, years)):
+            ids, dists = ids + delta_ids, dists + delta_dists
+            order = np.argsort(dists, kind='stable')[:max(n_candidates, len(ids) - len(delta_ids))]
+            merged.append(([ids[i] for i in order], [dists[i] for i in order]))
+        return merged
+
+    def _search_index(self, scaled_queries: np.ndarray, n_candidates: int, search_k: int = None,
+                      engine: str = None, max_workers: int = None, years: List[int] = None) -> List[tuple]:
+        """Search the built index (Annoy or exact) only"""
+        engine = engine or self.engine
+        if years is None or not self.era_bounds:
+            years = [None] * len(scaled_queries)
+        
+        if engine == 'exact':
+            if all(year is None for year in years):
+                return self._exact_search(scaled_queries, n_candidates)
+            return [
+                self._era_search(query, year, n_candidates, search_k, engine)
+                if year is not None else self._exact_search(query[None, :], n_candidates)[0]
+                for query, year in zip(scaled_queries, years)
+            ]
+        
+        def lookup(args):
+            query, year = args
+            if year is not None:
+                return self._era_search(query, year, n_candidates, search_k, engine)
+            return self.content_index.get_nns_by_vector(
+                query,
+                n_candidates,
+                include_distances=True,
+                search_k=self._search_k(n_candidates, search_k)
+            )
+        
+        # Annoy releases the GIL during lookups, so threads give real parallelism
+        if len(scaled_queries) == 1:
+            return [lookup((scaled_queries[0], years[0]))]
+        workers = max_workers or min(len(scaled_queries), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lookup, zip(scaled_queries, years)))
+
+    def _search_k(self, n_candidates: int, search_k: int = None) -> int:
+        """Get candidates with search_k optimization"""
+        if search_k is not None:
+            return search_k
+        return min(n_candidates * 25, 10000)  # Optimize search depth
+
+    def _era_search(self, query: np.ndarray, year: int, n_candidates: int,
+                    search_k: int = None, engine: str = 'annoy') -> tuple:
+        """Merge candidates from the era indexes around a year, closest first"""
+        plan = self.plan_era_probes(year, n_candidates)
+        if not plan:
+            if engine == 'exact':
+                return self._exact_search(query[None, :], n_candidates)[0]
+            return self.content_index.get_nns_by_vector(
+                query, n_candidates, include_distances=True,
+                search_k=self._search_k(n_candidates, search_k)
+            )
+        
+        candidates, distances = [], []
+        planned = sum(plan.values())
+        for era, n_era in plan.items():
+            start, stop = self.era_bounds[era]
+            if engine == 'exact':
+                ids, dists = self._exact_search(query[None, :], n_era, ids=self.era_ids[start:stop])[0]
+            else:
+                # An explicit search depth is a budget for the whole query, split like the candidates
+                era_search_k = None if search_k is None else max(n_era, round(search_k * n_era / planned))
+                local_ids, dists = self.era_indexes[era].get_nns_by_vector(
+                    query, n_era, include_distances=True,
+                    search_k=self._search_k(n_era, era_search_k)
+                )
+                ids = [int(self.era_ids[start + i]) for i in local_ids]
+            candidates.extend(ids)
+            distances.extend(dists)
+        
+        order = np.argsort(distances, kind='stable')
+        return [candidates[i] for i in order], [distances[i] for i in order]
+
+    def _exact_search(self, scaled_queries: np.ndarray, n_candidates: int, ids: np.ndarray = None) -> List[tuple]:
+        """Exact angular nearest neighbours by chunked dot products over the feature matrix (or a subset of ids)"""
+        n_songs = len(self.features) if ids is None else len(ids)
+        n_queries = len(scaled_queries)
+        k = min(n_candidates, n_songs)
+        if k == 0:
+            return [([], []) for _ in range(n_queries)]
+        
+        if self._feature_norms is None:
+            norms = np.linalg.norm(self.features, axis=1).astype(np.float32)
+            norms[norms == 0] = 1.0
+            self._feature_norms = norms
+        queries = np.asarray(scaled_queries, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        query_norms[query_norms == 0] = 1.0
+        unit_queries = (queries / query_norms).T  # (dims, n_queries)
+        
+        # Running top-k cosine similarities per query, merged chunk by chunk
+        best_sims = np.full((k, n_queries), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((k, n_queries), dtype=np.int64)
+        chunk_rows = max(k, self.exact_chunk_elements // max(n_queries, 1))
+        columns = np.arange(n_queries)
+        
+        for start in range(0, n_songs, chunk_rows):
+            stop = min(start + chunk_rows, n_songs)
+            if ids is None:
+                block, block_norms = self.features[start:stop], self._feature_norms[start:stop]
+            else:
+                block_ids = ids[start:stop]
+                block, block_norms = self.features[block_ids], self._feature_norms[block_ids]
+            sims = (block @ unit_queries) / block_norms[:, None]
+            if stop - start > k:
+                top = np.argpartition(sims, -k, axis=0)[-k:]
+                top_sims = sims[top, columns]
+            else:
+                top = np.broadcast_to(np.arange(stop - start)[:, None], sims.shape)
+                top_sims = sims
+            merged_sims = np.vstack([best_sims, top_sims])
+            merged_ids = np.vstack([best_ids, top + start if ids is None else np.asarray(ids[start:stop])[top]])
+            keep = np.argpartition(merged_sims, -k, axis=0)[-k:]
+            best_sims = merged_sims[keep, columns]
+            best_ids = merged_ids[keep, columns]
+        
+        # Sort each query's candidates and convert cosine to Annoy's angular distance
+        order = np.argsort(-best_sims, axis=0)
+        best_sims = best_sims[order, columns]
+        best_ids = best_ids[order, columns]
+        distances = np.sqrt(np.maximum(2.0 - 2.0 * best_sims, 0.0))
+        return [
+            (best_ids[:, q].tolist(), distances[:, q].tolist())
+            for q in range(n_queries)
+        ]
+
+    def recommend_from_features(self, features: Dict[str, float], year: int = None, n_recommendations: int = 10) -> Dict[str, List]:
+        """Get recommendations with memory-efficient processing"""
+        return self.recommend_batch([features], [year], n_recommendations)[0]
+
+    def recommend_batch(self, features_list: List[Dict[str, float]], years: List[int] = None,
+                        n_recommendations: int = 10, max_workers: int = None) -> List[Dict[str, List]]:
+        """Get recommendations for many queries, scaling them together and fanning out ANN lookups"""
+        if not features_list:
+            return []
+        if years is None:
+            years = [None] * len(features_list)
+        
+        # Scale and weight the whole query matrix at once
+        scaled_queries = self._prepare_queries(features_list)
+        return self._recommend_scaled(scaled_queries, years, n_recommendations, max_workers)
+
+    def _recommend_scaled(self, scaled_queries: np.ndarray, years: List[int], n_recommendations: int,
+                          max_workers: int = None, with_similarities: bool = True) -> list:
+        """Search and rerank scaled queries; without similarities only the ranked id arrays are returned"""
+        # Get a larger candidate pool to rerank; year-aware queries probe neighbouring eras.
+        # The search depth stays sized for the recommendations: Annoy inspects that many
+        # nodes either way, so the extra candidates cost almost nothing to return.
+        hits = self.search_candidates(
+            scaled_queries, n_recommendations * self.candidate_multiplier,
+            search_k=self._search_k(n_recommendations * 2), max_workers=max_workers, years=years
+        )
+        if self.candidate_observer is not None:
+            self.candidate_observer(self.engine, [len(candidates) for candidates, _ in hits])
+        
+        if not with_similarities:
+            return [
+                self._rank(query, candidates, distances, year, n_recommendations)[0]
+                for query, (candidates, distances), year in zip(scaled_queries, hits, years)
+            ]
+        return [
+            self._rank_candidates(query, candidates, distances, year, n_recommendations)
+            for query, (candidates, distances), year in zip(scaled_queries, hits, years)
+        ]
+
+    def _neighbours_cover(self, song_id: int, n_recommendations: int) -> bool:
+        """Whether the neighbour table answers a request exactly as a search would rank it"""
+        config = self.neighbour_config
+        return (
+            self.neighbours is not None and song_id < len(self.neighbours)
+            and n_recommendations <= config['k']
+            # Tables from before the engine was recorded were always built with Annoy
+            and config.get('engine', 'annoy') == self.engine
+            and config['rerank_weights'] == self.rerank_weights
+            and config['candidate_multiplier'] == self.candidate_multiplier
+        )
+
+    def recommend_for_song(self, song_id: int, n_recommendations: int = 10) -> Dict[str, List]:
+        """Recommendations seeded by a catalog song, without any feature lookup; the song itself is excluded.
+
+        Served from the neighbour table when it covers the request; songs added since
+        the build are reranked in from the delta buffer. Otherwise the song's own
+        features are searched like any query.
+        """
+        features, years, _ = self._gather(np.array([song_id]))
+        year = int(years[0])
+        query = self._scale_queries(self._raw_features(features))[0]
+        if not self._neighbours_cover(song_id, n_recommendations):
+            result = self._recommend_scaled(query[None, :], [year], n_recommendations + 1)[0]
+            keep = [i for i, idx in enumerate(result['song_indices']) if idx != song_id][:n_recommendations]
+            return {key: [values[i] for i in keep] for key, values in result.items()}
+        
+        ids = np.asarray(self.neighbours[song_id][:n_recommendations], dtype=np.int64)
+        ids = ids[ids >= 0]
+        if self.delta_size == 0:
+            return self._result(query, ids, self._gather(ids)[0])
+        delta_ids, _ = self._delta_search(query[None, :], n_recommendations * self.candidate_multiplier, [year])[0]
+        candidates = np.concatenate([ids, np.asarray(delta_ids, dtype=np.int64)])
+        candidate_features = self._gather(candidates)[0]
+        cosines = candidate_features @ query / np.maximum(
+            np.linalg.norm(candidate_features, axis=1) * np.linalg.norm(query), 1e-12
+        )
+        distances = np.sqrt(np.maximum(2.0 - 2.0 * cosines, 0.0))
+        return self._rank_candidates(query, candidates, distances, year, n_recommendations)
+
     def cleanup(self):
         """Free memory when recommender is not in use"""
         self._song_data = None
@@ -181,9 +948,11 @@ if __name__ == "__main__":
     # Initialize recommender
     recommender = LightweightRecommender()
     
-    # Build and save the model
-    print("Building new model...")
-    recommender.build_model('cleaned_data.csv', 'models')
+    # Build and save the model into a new versioned directory, then publish it
+    version = time.strftime('v%Y%m%d-%H%M%S')
+    print(f"Building new model {version}...")
+    recommender.build_model(sys.argv[1] if len(sys.argv) > 1 else 'cleaned_data.csv', f'models/{version}')
+    publish_model('models', version)
     
     # Test the model with sample data
     print("\nTesting model...")
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# First byte of every Redis payload, so the encoding can change without misreading old entries
+ENCODING_ZLIB_JSON = b'\x01'
+
+class LRUCache:
+    """Thread-safe in-process cache of bytes values, bounded by total size and entry age"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.size_bytes -= len(value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+class ResponseCache:
+    """Two-tier cache of serialized JSON responses: an in-process LRU in front of Redis.
+
+    Values are the exact response bytes, so a hit is returned without
+    decoding or re-serializing. Redis copies are zlib-compressed; Redis
+    evicts them by size through its own maxmemory policy.
+    """
+
+    def __init__(self, name: str, redis_client=None, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600):
+        self.name = name
+        self.redis = redis_client
+        self.ttl = ttl
+        self.local = LRUCache(max_bytes, ttl)
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self._bytes_gauge = metrics.CACHE_BYTES.labels(f"{name}_local")
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self.local.get(key)
+        if body is not None:
+            metrics.CACHE_LOOKUPS.labels(f"{self.name}_local", 'hit').inc()
+            return body
+        metrics.CACHE_LOOKUPS.labels(f"{self.name}_local", 'miss').inc()
+        if self.redis is None:
+            return None
+
+        try:
+            payload = self.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis error: {str(e)}")
+            self.redis_errors += 1
+            metrics.CACHE_LOOKUPS.labels(f"{self.name}_redis", 'error').inc()
+            return None
+        body = self._decode(payload) if payload else None
+        if body is None:
+            self.redis_misses += 1
+            metrics.CACHE_LOOKUPS.labels(f"{self.name}_redis", 'miss').inc()
+            return None
+        self.redis_hits += 1
+        metrics.CACHE_LOOKUPS.labels(f"{self.name}_redis", 'hit').inc()
+        self.local.set(key, body)
+        self._bytes_gauge.set(self.local.size_bytes)
+        return body
+
+    def set(self, key: str, body: bytes, ttl: float = None):
+        ttl = ttl if ttl is not None else self.ttl
+        self.local.set(key, body, ttl)
+        self._bytes_gauge.set(self.local.size_bytes)
+        if self.redis is None:
+            return
+        try:
+            self.redis.setex(key, int(ttl), ENCODING_ZLIB_JSON + zlib.compress(body))
+        except redis.RedisError as e:
+            logger.warning(f"Failed to cache results: {str(e)}")
+            self.redis_errors += 1
+
+    @staticmethod
+    def _decode(payload: bytes) -> Optional[bytes]:
+        """Response bytes from a Redis payload, or None for an unknown or corrupt encoding"""
+        if payload[:1] != ENCODING_ZLIB_JSON:
+            return None
+        try:
+            return zlib.decompress(payload[1:])
+        except zlib.error:
+            return None
+
+    def stats(self) -> dict:
+        redis_lookups = self.redis_hits + self.redis_misses
+        return {
+            'local': self.local.stats(),
+            'redis': {
+                'enabled': self.redis is not None,
+                'hits': self.redis_hits,
+                'misses': self.redis_misses,
+                'errors': self.redis_errors,
+                'hit_ratio': self.redis_hits / redis_lookups if redis_lookups else 0.0
+            }
+        }
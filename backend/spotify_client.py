@@ -0,0 +1,223 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import List, Optional
+
+import httpx
+
+import metrics
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+class SpotifyAPIError(Exception):
+    """Raised when the Spotify Web API returns an error response"""
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"Spotify API error {status_code}: {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class SpotifyTimeoutError(SpotifyAPIError):
+    """Raised when a Spotify call misses its deadline"""
+    def __init__(self, path: str, deadline: float):
+        super().__init__(504, f"{path} did not answer within {deadline:.1f}s")
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (Spotify sends delta-seconds)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def failure_reason(error: Exception) -> str:
+    """Short label for why a Spotify call failed, for fallback counters"""
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, SpotifyTimeoutError):
+        return 'timeout'
+    if isinstance(error, SpotifyAPIError) and error.status_code == 429:
+        return 'rate_limited'
+    return 'error'
+
+def is_retryable(error: Exception) -> bool:
+    """Transient failures worth one more attempt; timeouts, back-off requests and open circuits are not"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return (isinstance(error, SpotifyAPIError) and not isinstance(error, SpotifyTimeoutError)
+            and error.status_code >= 500)
+
+class AsyncSpotifyClient:
+    """Non-blocking Spotify Web API client with a pooled, keep-alive HTTP connection set"""
+
+    def __init__(self, client_id: str, client_secret: str, max_connections: int = 20,
+                 max_concurrency: int = 10, timeout: float = 10.0, deadline: float = 5.0,
+                 search_deadline: float = 3.0, hedge_after: float = 0.5,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # Whole-call deadlines (token, queueing and request), well under the transport timeout
+        self.deadline = deadline
+        self.search_deadline = search_deadline
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker('spotify', failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._token_lock = asyncio.Lock()
+        self._app_token = None
+        self._app_token_expires_at = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Lazily create the shared HTTP client inside the running event loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=SPOTIFY_API_BASE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30.0
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_app_token(self, force_refresh: bool = False) -> str:
+        """Get a client-credentials token, refreshing it shortly before expiry"""
+        async with self._token_lock:
+            if not force_refresh and self._app_token and time.monotonic() < self._app_token_expires_at:
+                return self._app_token
+            credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+            response = await self.client.post(
+                SPOTIFY_TOKEN_URL,
+                data={"grant_type": "client_credentials"},
+                headers={"Authorization": f"Basic {credentials}"}
+            )
+            if response.status_code != 200:
+                raise SpotifyAPIError(response.status_code, response.text)
+            token_info = response.json()
+            self._app_token = token_info["access_token"]
+            # Refresh a minute early so in-flight requests never carry an expired token
+            self._app_token_expires_at = time.monotonic() + token_info.get("expires_in", 3600) - 60
+            logger.debug("Obtained Spotify client-credentials token")
+            return self._app_token
+
+    async def warm_up(self):
+        """Fetch the app token ahead of the first request, within the call deadline"""
+        await asyncio.wait_for(self._get_app_token(), self.deadline)
+
+    async def _send(self, path: str, params: dict = None, user_token: Optional[str] = None) -> httpx.Response:
+        """Issue a GET request, bounded by the concurrency semaphore"""
+        token = user_token or await self._get_app_token()
+        async with self._semaphore:
+            response = await self.client.get(path, params=params, headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 401 and user_token is None:
+                # App token was revoked or expired early; refresh once and retry
+                token = await self._get_app_token(force_refresh=True)
+                response = await self.client.get(path, params=params, headers={"Authorization": f"Bearer {token}"})
+        return response
+
+    async def _get(self, path: str, params: dict = None, user_token: Optional[str] = None,
+                   deadline: Optional[float] = None) -> dict:
+        """Issue a GET request within a deadline, failing fast while the circuit breaker is open"""
+        deadline = deadline or self.deadline
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.SPOTIFY_CALLS.labels(path, 'circuit_open').inc()
+            raise
+        try:
+            response = await asyncio.wait_for(self._send(path, params, user_token), deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            metrics.SPOTIFY_CALLS.labels(path, 'timeout').inc()
+            raise SpotifyTimeoutError(path, deadline)
+        except (httpx.HTTPError, SpotifyAPIError) as e:
+            self.breaker.record_failure()
+            metrics.SPOTIFY_CALLS.labels(path, type(e).__name__).inc()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        metrics.SPOTIFY_CALLS.labels(path, str(response.status_code)).inc()
+        
+        if response.status_code == 429:
+            # Rate limited: stop calling (every caller falls back) until Spotify says to retry
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.breaker.record_failure(retry_after=retry_after if retry_after is not None else self.breaker.reset_timeout)
+            raise SpotifyAPIError(429, response.text, retry_after=retry_after)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise SpotifyAPIError(response.status_code, response.text)
+        self.breaker.record_success()
+        if response.status_code != 200:
+            raise SpotifyAPIError(response.status_code, response.text)
+        return response.json()
+
+    async def _hedged_get(self, path: str, params: dict, deadline: float, max_attempts: int = 2) -> dict:
+        """GET with a backup request when the first is slow and a retry when one fails fast; the first success wins"""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        attempts = [asyncio.ensure_future(self._get(path, params, deadline=deadline))]
+        started = 1
+        first_error = None
+        try:
+            while attempts:
+                can_hedge = started < max_attempts and self.breaker.state == CircuitBreaker.CLOSED
+                done, _ = await asyncio.wait(
+                    attempts, timeout=self.hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    metrics.SPOTIFY_HEDGES.labels(path, 'hedge').inc()
+                    attempts.append(asyncio.ensure_future(self._get(path, params, deadline=give_up_at - loop.time())))
+                    started += 1
+                    continue
+                for attempt in done:
+                    attempts.remove(attempt)
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    first_error = first_error or attempt.exception()
+                remaining = give_up_at - loop.time()
+                if not attempts and started < max_attempts and remaining > 0 and is_retryable(first_error):
+                    metrics.SPOTIFY_HEDGES.labels(path, 'retry').inc()
+                    attempts.append(asyncio.ensure_future(self._get(path, params, deadline=remaining)))
+                    started += 1
+            raise first_error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def search(self, q: str, limit: int = 10, type: str = "track", offset: int = 0, hedged: bool = False) -> dict:
+        """Search the Spotify catalog; hedged searches send a backup request if the first is slow"""
+        params = {"q": q, "limit": limit, "type": type, "offset": offset}
+        if hedged:
+            return await self._hedged_get("/search", params, self.search_deadline)
+        return await self._get("/search", params=params, deadline=self.search_deadline)
+
+    async def audio_features(self, track_ids: List[str]) -> list:
+        """Get audio features for up to 100 tracks"""
+        data = await self._get("/audio-features", params={"ids": ",".join(track_ids)})
+        return data.get("audio_features", [])
+
+    async def me(self, user_token: str) -> dict:
+        """Get the profile of the user owning the token"""
+        return await self._get("/me", user_token=user_token)
+
+    async def current_user_top_tracks(self, user_token: str, limit: int = 20, time_range: str = "medium_term") -> dict:
+        """Get the top tracks of the user owning the token"""
+        return await self._get(
+            "/me/top/tracks",
+            params={"limit": limit, "time_range": time_range},
+            user_token=user_token
+        )
@@ -0,0 +1,133 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from database import parse_artists
+
+PROFILE_FEATURES = ['acousticness', 'liveness', 'valence', 'tempo']
+PROFILE_TIME_RANGES = ('short_term', 'medium_term', 'long_term')
+MAX_PROFILE_TRACKS = 300
+
+def build_profile(tracks: List[dict], features_by_id: Dict[str, dict], max_clusters: int = 4,
+                  tracks_per_cluster: int = 8) -> dict:
+    """Cluster a user's top tracks into weighted taste centroids.
+
+    Clustering runs on standardized features so tempo does not dominate;
+    centroids are stored in raw feature units, ready to query the model with.
+    Tracks without features are left out; the caller needs at least one with them.
+    """
+    tracks = list({track['id']: track for track in tracks if track['id'] in features_by_id}.values())
+    raw = np.array([[features_by_id[track['id']][f] for f in PROFILE_FEATURES] for track in tracks], dtype=np.float64)
+    mean = raw.mean(axis=0)
+    std = raw.std(axis=0)
+    std[std == 0] = 1.0
+    scaled = (raw - mean) / std
+
+    n_clusters = max(1, min(max_clusters, len(tracks) // tracks_per_cluster))
+    if n_clusters == 1:
+        labels = np.zeros(len(tracks), dtype=int)
+    else:
+        labels = KMeans(n_clusters=n_clusters, n_init=4, random_state=0).fit_predict(scaled)
+
+    clusters = []
+    for label in range(n_clusters):
+        members = np.flatnonzero(labels == label)
+        if len(members) == 0:
+            continue
+        clusters.append({
+            'centroid': dict(zip(PROFILE_FEATURES, raw[members].mean(axis=0).tolist())),
+            'count': int(len(members)),
+            'examples': [tracks[i]['name'] for i in members[:3]]
+        })
+    clusters.sort(key=lambda c: c['count'], reverse=True)
+
+    now = time.time()
+    return {
+        'built_at': now,
+        'updated_at': now,
+        'scale': {'mean': mean.tolist(), 'std': std.tolist()},
+        'track_ids': [track['id'] for track in tracks][-MAX_PROFILE_TRACKS:],
+        'clusters': clusters
+    }
+
+def update_profile(profile: dict, tracks: List[dict], features_by_id: Dict[str, dict]) -> dict:
+    """Fold tracks the profile has not seen into their nearest centroid as a running mean"""
+    seen = set(profile['track_ids'])
+    new_tracks = [track for track in tracks if track['id'] not in seen and track['id'] in features_by_id]
+    mean = np.array(profile['scale']['mean'])
+    std = np.array(profile['scale']['std'])
+    centroids = np.array([[c['centroid'][f] for f in PROFILE_FEATURES] for c in profile['clusters']])
+
+    for track in new_tracks:
+        seen.add(track['id'])
+        vector = np.array([features_by_id[track['id']][f] for f in PROFILE_FEATURES])
+        nearest = int(np.argmin((((centroids - vector) / std) ** 2).sum(axis=1)))
+        cluster = profile['clusters'][nearest]
+        cluster['count'] += 1
+        centroids[nearest] += (vector - centroids[nearest]) / cluster['count']
+        cluster['centroid'] = dict(zip(PROFILE_FEATURES, centroids[nearest].tolist()))
+        profile['track_ids'].append(track['id'])
+
+    profile['track_ids'] = profile['track_ids'][-MAX_PROFILE_TRACKS:]
+    profile['updated_at'] = time.time()
+    return profile
+
+def profile_average(profile: dict) -> dict:
+    """Count-weighted mean of the centroids"""
+    total = sum(c['count'] for c in profile['clusters'])
+    return {
+        f: sum(c['centroid'][f] * c['count'] for c in profile['clusters']) / total
+        for f in PROFILE_FEATURES
+    }
+
+def diversify(ranked_lists: List[List[dict]], weights: List[float], limit: int, max_per_artist: int = 2) -> List[dict]:
+    """Merge per-centroid rankings into one list.
+
+    Each centroid gets a share of the slots proportional to its weight and
+    contributes its best remaining songs in turn; duplicates are dropped and
+    no artist appears more than max_per_artist times while alternatives remain.
+    Each artist of a collaboration counts separately.
+    """
+    total = sum(weights) or 1.0
+    quotas = [max(1, round(limit * w / total)) for w in weights]
+    positions = [0] * len(ranked_lists)
+    taken = [0] * len(ranked_lists)
+    chosen, chosen_ids, artist_counts, held_back = [], set(), {}, []
+
+    while len(chosen) < limit:
+        progressed = False
+        for i, ranked in enumerate(ranked_lists):
+            if taken[i] >= quotas[i] and any(taken[j] < quotas[j] and positions[j] < len(ranked_lists[j])
+                                             for j in range(len(ranked_lists))):
+                continue
+            while positions[i] < len(ranked):
+                song = ranked[positions[i]]
+                positions[i] += 1
+                if song['id'] in chosen_ids:
+                    continue
+                artists = parse_artists(song['artists'])
+                if any(artist_counts.get(artist, 0) >= max_per_artist for artist in artists):
+                    held_back.append(song)
+                    continue
+                chosen.append(song)
+                chosen_ids.add(song['id'])
+                for artist in artists:
+                    artist_counts[artist] = artist_counts.get(artist, 0) + 1
+                taken[i] += 1
+                progressed = True
+                break
+            if len(chosen) >= limit:
+                break
+        if not progressed:
+            break
+
+    # Fill any remaining slots with songs held back for artist diversity
+    for song in held_back:
+        if len(chosen) >= limit:
+            break
+        if song['id'] not in chosen_ids:
+            chosen.append(song)
+            chosen_ids.add(song['id'])
+    return chosen
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# app.py reads its configuration at import time, so point it at a scratch
+# directory before any test imports it
+WORK_DIR = tempfile.mkdtemp(prefix='spotopia-tests-')
+MODELS_ROOT = os.path.join(WORK_DIR, 'models')
+ADMIN_TOKEN = 'test-admin-token'
+N_SONGS = 2000
+os.environ.update({
+    'MODELS_ROOT': MODELS_ROOT,
+    'SONGS_DB_PATH': os.path.join(WORK_DIR, 'songs.db'),
+    'DB_POOL_SIZE': '2',
+    'REDIS_HOST': '127.0.0.1',
+    'REDIS_PORT': '1',
+    'REDIS_TIMEOUT': '0.2',
+    'ADMIN_TOKEN': ADMIN_TOKEN,
+    'DELTA_COMPACT_THRESHOLD': '1000000',
+})
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+def build_test_model():
+    """Build a small synthetic model as models/v1 and publish it"""
+    from benchmark import make_synthetic_catalog
+    from recommender import LightweightRecommender, publish_model
+
+    csv_path = os.path.join(WORK_DIR, 'catalog.csv')
+    make_synthetic_catalog(csv_path, N_SONGS)
+    LightweightRecommender().build_model(csv_path, os.path.join(MODELS_ROOT, 'v1'), n_trees=10)
+    publish_model(MODELS_ROOT, 'v1')
+
+build_test_model()
+
+class FakeSpotify:
+    """Stand-in for AsyncSpotifyClient: every query matches up to three tracks, after an optional delay"""
+
+    def __init__(self):
+        from circuit_breaker import CircuitBreaker
+        self.breaker = CircuitBreaker('spotify_test')
+        self.reset()
+
+    def reset(self):
+        self.calls = []
+        self.delay = 0.0
+        self.failures = {}  # call name -> exception it raises
+
+    async def _call(self, name: str, *args):
+        self.calls.append((name, *args))
+        await asyncio.sleep(self.delay)
+        if name in self.failures:
+            raise self.failures[name]
+
+    async def warm_up(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def search(self, q: str, limit: int = 10, type: str = 'track', hedged: bool = False, **kwargs):
+        await self._call('search', q)
+        items = [{
+            'id': f'{abs(hash(q))}-{i}',
+            'name': f'{q} {i}',
+            'artists': [{'name': 'Fake Artist'}],
+            'album': {'release_date': '1999-01-01', 'images': []},
+            'popularity': 50,
+            'preview_url': None,
+            'external_urls': {'spotify': 'https://open.spotify.com/track/fake'}
+        } for i in range(min(limit, 3))]
+        return {'tracks': {'items': items}}
+
+    async def audio_features(self, track_ids):
+        await self._call('audio_features', tuple(track_ids))
+        return [
+            {'id': track_id, 'acousticness': 0.3, 'liveness': 0.1, 'valence': 0.7, 'tempo': 110.0}
+            for track_id in track_ids
+        ]
+
+    async def me(self, user_token: str):
+        await self._call('me')
+        return {'id': 'test-user', 'display_name': 'Test User'}
+
+    async def current_user_top_tracks(self, user_token: str, limit: int = 20, time_range: str = 'medium_term', offset: int = 0):
+        await self._call('top_tracks', time_range)
+        return {'items': (await self.search(f'top {time_range}', limit=limit))['tracks']['items']}
+
+@pytest.fixture(scope='session')
+def appmod():
+    import app
+    app.spotify = FakeSpotify()
+    app.app.dependency_overrides[app.get_current_token] = lambda: 'test-user-token'
+    return app
+
+@pytest.fixture(scope='session')
+def client(appmod):
+    from fastapi.testclient import TestClient
+    with TestClient(appmod.app) as test_client:
+        # Startup runs in the background; wait until the catalog is loaded
+        deadline = time.monotonic() + 60
+        while test_client.get('/ready').status_code != 200:
+            assert time.monotonic() < deadline, "service did not become ready"
+            time.sleep(0.05)
+        yield test_client
+
+@pytest.fixture
+def spotify(appmod):
+    appmod.spotify.reset()
+    yield appmod.spotify
+    appmod.spotify.reset()
@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+FEATURES = {'acousticness': 0.4, 'liveness': 0.2, 'valence': 0.6, 'tempo': 120.0}
+
+def test_batch_model_call_runs_off_the_event_loop(client, appmod, monkeypatch):
+    recommender = appmod.model_registry.current
+    recommend_batch = recommender.recommend_batch
+
+    def slow_recommend_batch(*args, **kwargs):
+        time.sleep(0.5)
+        return recommend_batch(*args, **kwargs)
+
+    monkeypatch.setattr(recommender, 'recommend_batch', slow_recommend_batch)
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(client.post, '/recommend/batch', json={'seeds': [{'features': FEATURES}]})
+        time.sleep(0.1)
+        health_start = time.monotonic()
+        assert client.get('/healthz').status_code == 200
+        health_seconds = time.monotonic() - health_start
+        response = future.result()
+    assert response.status_code == 200
+    assert response.json()['results'][0]['recommendations']
+    assert health_seconds < 0.3
+
+@pytest.mark.parametrize('limit', [None, 0, -1, 51, 'many'])
+def test_batch_limit_is_validated(client, limit):
+    response = client.post('/recommend/batch', json={'seeds': [{'features': FEATURES}], 'limit': limit})
+    assert response.status_code == 422
+
+def test_batch_limit_bounds_each_seeds_recommendations(client):
+    response = client.post('/recommend/batch', json={'seeds': [{'features': FEATURES}] * 2, 'limit': 50})
+    assert response.status_code == 200
+    assert [len(result['recommendations']) for result in response.json()['results']] == [50, 50]
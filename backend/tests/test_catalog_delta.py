@@ -0,0 +1,48 @@
+import sqlite3
+
+import database
+from conftest import ADMIN_TOKEN
+
+ADMIN_HEADERS = {'X-Admin-Token': ADMIN_TOKEN}
+NEW_FEATURES = {'acousticness': 0.99, 'liveness': 0.97, 'valence': 0.02, 'tempo': 231.0}
+
+def recommended_names(client):
+    response = client.post('/recommend/batch', json={'seeds': [{'features': NEW_FEATURES, 'year': 2024}], 'limit': 10})
+    assert response.status_code == 200
+    return [song['name'] for song in response.json()['results'][0]['recommendations']]
+
+def test_added_song_is_recommended_before_and_after_compaction(client, appmod, monkeypatch):
+    song = {'name': 'Freshly Added', 'artists': ['New Artist'], 'year': 2024, 'popularity': 10.0, 'features': NEW_FEATURES}
+    response = client.post('/admin/songs', json={'songs': [song]}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()['delta_size'] >= 1
+    # Served from the delta buffer before any rebuild
+    assert 'Freshly Added' in recommended_names(client)
+
+    previous = appmod.model_registry.current
+    # A compaction keeps the lineage, so the songs table must not be reloaded
+    def no_bulk_load(*args, **kwargs):
+        raise AssertionError("songs table was reloaded")
+    monkeypatch.setattr(database, 'bulk_load_songs', no_bulk_load)
+    response = client.post('/admin/compact', headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    version = response.json()['model_version']
+    assert response.json()['compacted'] and version != previous.model_version
+
+    current = appmod.model_registry.current
+    assert current.model_version == version
+    assert current.lineage == previous.lineage
+    assert current.delta_size == 0
+    with open(f"{appmod.MODELS_ROOT}/CURRENT") as f:
+        assert f.read().strip() == version
+    conn = sqlite3.connect(appmod.DB_PATH)
+    try:
+        assert database.get_catalog_version(conn) == version
+    finally:
+        conn.close()
+    # Now served from the rebuilt index
+    assert 'Freshly Added' in recommended_names(client)
+
+    # Nothing left to fold in
+    response = client.post('/admin/compact', headers=ADMIN_HEADERS)
+    assert response.json() == {'compacted': False, 'model_version': None}
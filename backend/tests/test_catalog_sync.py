@@ -0,0 +1,54 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import database
+
+def catalog_chunk(ids):
+    return pd.DataFrame({
+        'name': [f'song {i}' for i in ids],
+        'artists': ["['artist']"] * len(ids),
+        'year': [2000] * len(ids),
+        'popularity': [50.0] * len(ids),
+    }, index=list(ids))
+
+def song_indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'songs'")}
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'songs.db'))
+    database.init_schema(conn)
+    yield conn
+    conn.close()
+
+def test_catalog_covers_same_lineage_with_every_indexed_row(conn):
+    database.bulk_load_songs(conn, [catalog_chunk(range(10))], 'v1', 'lineage-a')
+    # Songs added after the load are inserted directly and indexed by the next compaction
+    database.insert_songs(conn, [{'id': 10, 'name': 'added', 'artists': "['artist']", 'year': 2020, 'popularity': 0.0}])
+
+    assert database.catalog_covers(conn, 'lineage-a', 11)
+    assert not database.catalog_covers(conn, 'lineage-a', 12)
+    assert not database.catalog_covers(conn, 'lineage-b', 11)
+
+    database.set_catalog_version(conn, 'v2', 'lineage-a')
+    conn.commit()
+    assert database.catalog_is_current(conn, 'v2')
+
+def test_failed_bulk_load_leaves_the_old_catalog_and_indexes(conn):
+    database.bulk_load_songs(conn, [catalog_chunk(range(10))], 'v1', 'lineage-a')
+    indexes = song_indexes(conn)
+    assert set(database.SONG_INDEXES) <= indexes
+
+    def failing_chunks():
+        yield catalog_chunk(range(5))
+        raise OSError('catalog read failed')
+
+    with pytest.raises(OSError):
+        database.bulk_load_songs(conn, failing_chunks(), 'v2', 'lineage-b')
+    conn.rollback()
+
+    assert conn.execute('SELECT COUNT(*) FROM songs').fetchone()[0] == 10
+    assert song_indexes(conn) == indexes
+    assert database.get_catalog_version(conn) == 'v1'
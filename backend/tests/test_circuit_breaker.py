@@ -0,0 +1,72 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+def test_consecutive_failures_open_the_circuit(clock):
+    breaker = CircuitBreaker('test_threshold', failure_threshold=3, reset_timeout=10.0)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    # A success resets the count
+    breaker.record_success()
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 10.0
+
+def test_single_probe_after_timeout_closes_on_success(clock):
+    breaker = CircuitBreaker('test_probe_success', failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.now += 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    # Only one probe is in flight at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker('test_probe_failure', failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.now += 10.0
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 10.0
+
+def test_cancelled_probe_lets_another_through(clock):
+    breaker = CircuitBreaker('test_probe_cancelled', failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.now += 10.0
+    breaker.before_call()
+    breaker.record_cancelled()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_retry_after_opens_at_once_for_the_given_delay(clock):
+    breaker = CircuitBreaker('test_retry_after', failure_threshold=5, reset_timeout=10.0)
+    breaker.record_failure(retry_after=42.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 42.0
+    clock.now += 42.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import database
+
+def test_pool_reuses_connections_and_times_out_when_empty(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'), size=1, timeout=0.1)
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+    with pool.connection() as again:
+        assert again is conn
+    pool.close_all()
+
+def test_concurrent_requests_beyond_pool_size_do_not_stall(client, spotify, appmod):
+    # Every request waits on Spotify twice (search, then audio features)
+    spotify.delay = 0.3
+    n_requests = appmod.db_pool.size * 4
+
+    def recommend_batch(i):
+        return client.post('/recommend/batch', json={'seeds': [{'song_name': f'unknown song {i}'}], 'limit': 5})
+
+    with ThreadPoolExecutor(n_requests) as executor:
+        start = time.monotonic()
+        futures = [executor.submit(recommend_batch, i) for i in range(n_requests)]
+        time.sleep(0.1)
+        health_start = time.monotonic()
+        assert client.get('/healthz').status_code == 200
+        health_seconds = time.monotonic() - health_start
+        responses = [future.result() for future in futures]
+        elapsed = time.monotonic() - start
+
+    assert [response.status_code for response in responses] == [200] * n_requests
+    assert all(response.json()['results'][0]['recommendations'] for response in responses)
+    # The event loop stays free while the requests wait on Spotify
+    assert health_seconds < 1.0
+    # A connection held across the Spotify calls would leave the rest waiting out the acquire timeout
+    assert elapsed < appmod.db_pool.timeout
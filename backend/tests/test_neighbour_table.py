@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+
+from conftest import MODELS_ROOT
+from recommender import LightweightRecommender
+
+def load(engine):
+    recommender = LightweightRecommender(engine=engine)
+    recommender.load_model(os.path.join(MODELS_ROOT, 'v1'))
+    return recommender
+
+def test_neighbour_table_only_serves_the_engine_it_was_built_with():
+    annoy = load('annoy')
+    exact = load('exact')
+    assert annoy.neighbour_config['engine'] == 'annoy'
+    assert annoy._neighbours_cover(0, 10)
+    assert not exact._neighbours_cover(0, 10)
+
+    # The exact engine ranks from a live search, not from the Annoy-built table
+    song_id = 42
+    features, years, _ = exact._gather(np.array([song_id]))
+    live = exact.recommend_from_features(
+        dict(zip(exact.base_features, exact._raw_features(features)[0])), year=int(years[0]), n_recommendations=11
+    )
+    assert exact.recommend_for_song(song_id, 10)['song_indices'] == [idx for idx in live['song_indices'] if idx != song_id][:10]
+
+def test_neighbour_table_covers_ui_limits_and_excludes_the_seed():
+    recommender = load('annoy')
+    assert recommender.neighbour_k >= 20
+    assert recommender._neighbours_cover(0, 12)
+    for song_id in range(0, 2000, 97):
+        ids = recommender.recommend_for_song(song_id, 12)['song_indices']
+        assert len(ids) == 12 and song_id not in ids
@@ -0,0 +1,12 @@
+def test_rows_are_matched_to_similarities_by_id(appmod):
+    recommendation_data = {
+        'song_indices': [7, 3, 9],
+        'feature_similarities': [{'valence': 0.9}, {'valence': 0.5}, {'valence': 0.1}],
+    }
+    # Song 3 has no row, e.g. it is not in the songs table yet
+    rows = [{'id': 7, 'name': 'seven'}, {'id': 9, 'name': 'nine'}]
+
+    assert appmod.recommendation_rows(rows, recommendation_data) == [
+        {'id': 7, 'name': 'seven', 'feature_similarities': {'valence': 0.9}},
+        {'id': 9, 'name': 'nine', 'feature_similarities': {'valence': 0.1}},
+    ]
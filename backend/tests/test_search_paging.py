@@ -0,0 +1,38 @@
+import pytest
+
+import database
+
+QUERY = 'song 1'
+
+def local_results(response):
+    assert response.status_code == 200
+    body = response.json()
+    return [song for song in body['results'] if song['source'] == 'local'], body['next_cursor']
+
+def test_cursor_pages_cover_every_match_once_in_popularity_order(client, appmod, spotify):
+    with appmod.db_pool.connection() as conn:
+        expected = [row['id'] for row in database.search_songs_page(conn, QUERY, 10000)]
+    assert len(expected) > 20
+
+    response = client.get('/search', params={'query': QUERY, 'limit': 7, 'sort': 'popularity'})
+    page, cursor = local_results(response)
+    seen = [song['id'] for song in page]
+    n_pages = 1
+    while cursor is not None:
+        page, cursor = local_results(client.get('/search', params={'query': QUERY, 'limit': 7, 'cursor': cursor}))
+        seen += [song['id'] for song in page]
+        n_pages += 1
+    assert seen == expected
+    # A full last page still returns a cursor, which then yields an empty page
+    assert n_pages == len(expected) // 7 + 1
+    # Spotify is only asked for the first page
+    assert [call[0] for call in spotify.calls] == ['search']
+
+@pytest.mark.parametrize('params', [
+    {'cursor': 'not-a-cursor'},
+    {'limit': 0, 'sort': 'popularity'},
+    {'limit': -1},
+    {'sort': 'newest'},
+])
+def test_invalid_search_parameters_are_rejected(client, params):
+    assert client.get('/search', params={'query': QUERY, **params}).status_code == 400
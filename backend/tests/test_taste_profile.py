@@ -0,0 +1,68 @@
+from response_cache import LRUCache
+from taste_profile import build_profile, diversify
+
+def song(song_id: int, artists: str) -> dict:
+    return {'id': song_id, 'artists': artists}
+
+def test_diversify_caps_each_artist_of_a_collaboration():
+    ranked = [[
+        song(1, "['A']"),
+        song(2, "['A', 'B']"),
+        song(3, "['A', 'C']"),
+        song(4, "['D']"),
+    ]]
+    chosen = diversify(ranked, [1], limit=3, max_per_artist=2)
+    # 'A' already appears twice, so the A/C collaboration waits behind D
+    assert [s['id'] for s in chosen] == [1, 2, 4]
+
+def test_diversify_fills_remaining_slots_with_held_back_songs():
+    ranked = [[song(1, "['A']"), song(2, "['A']"), song(3, "['A', 'B']")]]
+    assert [s['id'] for s in diversify(ranked, [1], limit=3, max_per_artist=2)] == [1, 2, 3]
+
+def test_build_profile_skips_tracks_without_features():
+    tracks = [{'id': f't{i}', 'name': f'Track {i}'} for i in range(4)]
+    features = {'t0': {'acousticness': 0.2, 'liveness': 0.1, 'valence': 0.9, 'tempo': 100.0},
+                't1': {'acousticness': 0.4, 'liveness': 0.3, 'valence': 0.7, 'tempo': 140.0}}
+    profile = build_profile(tracks, features)
+    assert profile['track_ids'] == ['t0', 't1']
+    assert sum(c['count'] for c in profile['clusters']) == 2
+    assert profile['clusters'][0]['centroid']['tempo'] == 120.0
+
+def test_profile_is_not_built_from_fallback_features(client, spotify, appmod):
+    spotify.failures['audio_features'] = RuntimeError('audio features down')
+    response = client.get('/personalized-recommendations?limit=5')
+    assert response.status_code == 503
+    assert appmod.profile_cache.get('profile_test-user') is None
+
+    spotify.failures.clear()
+    response = client.get('/personalized-recommendations?limit=5')
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body['recommendations']) == 5
+    # Every cluster comes from real features, none from the fallback vector
+    fallback = appmod.get_fallback_features()
+    assert all(c['centroid'] != fallback for c in body['profile']['clusters'])
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+def test_user_id_is_shared_across_workers(client, spotify, appmod, monkeypatch):
+    shared = FakeRedis()
+    monkeypatch.setattr(appmod.user_cache, 'redis', shared)
+    monkeypatch.setattr(appmod.user_cache, 'local', LRUCache(1024 * 1024, 600))
+    assert client.get('/personalized-recommendations?limit=5').status_code == 200
+    assert [call for call in spotify.calls if call[0] == 'me'] == [('me',)]
+    assert appmod.user_cache_key('test-user-token', 'user_id') in shared.data
+
+    # Another worker starts with an empty in-process tier and reads the id from Redis
+    monkeypatch.setattr(appmod.user_cache, 'local', LRUCache(1024 * 1024, 600))
+    spotify.calls.clear()
+    assert client.get('/personalized-recommendations?limit=5').status_code == 200
+    assert spotify.calls == []